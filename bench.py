@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+''' Benchmarks for the per-request overhead of curl_requests.
+
+    The HTTP benchmarks run against a keep-alive loopback server in a
+    separate process (so that it does not compete for our GIL). Results
+    are written as JSON, and can be compared against an earlier run:
+
+        python bench.py --output new.json --compare old.json
+'''
+
+import argparse
+import http.server
+import json
+import multiprocessing
+import platform
+import sys
+import time
+
+import pycurl
+
+import curl_requests
+from curl_requests._headers import last_block, parse_block
+from curl_requests.structures import CaseInsensitiveDict, HTTPHeaders
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+
+SMALL = b'x' * 100
+LARGE = b'x' * (1 << 20)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True # or delayed ACKs dominate small responses
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(LARGE if self.path == '/large' else SMALL)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(SMALL)
+
+    do_PUT = do_POST
+
+
+def _serve(conn):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    conn.send(server.server_port)
+    server.serve_forever()
+
+
+def _latencies(fn, n, warmup):
+    for _ in range(warmup):
+        fn()
+    rv = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        rv.append(time.perf_counter() - start)
+    return rv
+
+
+def _summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / sum(latencies),
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+    }
+
+
+def bench_http(url, n, warmup):
+    small = url + 'small'
+    large = url + 'large'
+    cases = {}
+    with curl_requests.Session() as sess:
+        cases['session_get_small'] = lambda: sess.get(small).content
+        cases['session_get_large'] = lambda: sess.get(large).content
+        cases['session_post_small'] = lambda: sess.post(small, data=SMALL).content
+        cases['session_put_small'] = lambda: sess.put(small, data=SMALL).content
+        cases['session_put_large'] = lambda: sess.put(small, data=LARGE).content
+        cases['module_get_small'] = lambda: curl_requests.get(small).content
+        if requests is not None:
+            rsess = requests.Session()
+            cases['requests_session_get_small'] = lambda: rsess.get(small).content
+            cases['requests_session_get_large'] = lambda: rsess.get(large).content
+            cases['requests_module_get_small'] = lambda: requests.get(small).content
+        rv = {}
+        for name, fn in cases.items():
+            count = n // 10 if 'large' in name else n
+            rv[name] = _summarize(_latencies(fn, count, warmup))
+            print('%-30s %10.0f req/s  p50 %7.3f ms  p99 %7.3f ms' % (name, rv[name]['rps'], rv[name]['p50_ms'], rv[name]['p99_ms']), file=sys.stderr)
+    return rv
+
+
+def _per_op(fn, n):
+    ''' Return the best of 5 runs of `fn` `n` times, in ns per call.
+    '''
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return 1e9 * best / n
+
+
+def bench_micro(n):
+    raw = (
+        b'HTTP/1.1 301 Moved Permanently\r\nLocation: /x\r\nContent-Length: 0\r\n\r\n'
+        b'HTTP/1.1 200 OK\r\nServer: bench\r\nDate: Mon, 01 Jan 2024 00:00:00 GMT\r\n'
+        b'Content-Type: application/json\r\nContent-Length: 100\r\nCache-Control: max-age=60\r\n'
+        b'ETag: "abc"\r\nSet-Cookie: a=1\r\nSet-Cookie: b=2\r\nVary: Accept-Encoding\r\n\r\n'
+    )
+    fields = parse_block(last_block(raw))[1]
+    headers = HTTPHeaders(fields)
+    cid = CaseInsensitiveDict()
+
+    def cid_ops():
+        cid['Content-Type'] = 'text/plain'
+        cid['content-type']
+        'CONTENT-TYPE' in cid
+        del cid['Content-Type']
+
+    cases = {
+        'parse_headers': lambda: parse_block(last_block(raw)),
+        'build_http_headers': lambda: HTTPHeaders(fields),
+        'http_headers_lookup': lambda: headers['content-length'],
+        'case_insensitive_dict_ops': cid_ops,
+        'codes_lookup': lambda: curl_requests.codes(200),
+        'codes_attribute': lambda: curl_requests.codes.not_found,
+    }
+    rv = {}
+    for name, fn in cases.items():
+        rv[name] = {'ns_per_op': _per_op(fn, n)}
+        print('%-30s %10.0f ns/op' % (name, rv[name]['ns_per_op']), file=sys.stderr)
+    return rv
+
+
+def compare(old, new):
+    ''' Print the change of every metric from `old` to `new` results.
+    '''
+    for section, key, better in [('http', 'rps', 'higher'), ('http', 'p99_ms', 'lower'), ('micro', 'ns_per_op', 'lower')]:
+        for name, result in sorted(new.get(section, {}).items()):
+            before = old.get(section, {}).get(name, {}).get(key)
+            if not before:
+                continue
+            change = result[key] / before - 1
+            print('%-30s %-10s %+7.1f%% (%s is better)' % (name, key, 100 * change, better), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0].strip())
+    parser.add_argument('-n', type=int, default=1000, help='requests per HTTP benchmark (a tenth for large bodies)')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--micro', type=int, default=20000, help='iterations per micro-benchmark')
+    parser.add_argument('--output', default='bench_output.txt', help='where to write the JSON results')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(child,), daemon=True)
+    server.start()
+    try:
+        url = 'http://127.0.0.1:%d/' % parent.recv()
+        results = {
+            'meta': {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'pycurl': pycurl.version,
+                'requests': requests.__version__ if requests is not None else None,
+                'n': args.n,
+            },
+            'http': bench_http(url, args.n, args.warmup),
+            'micro': bench_micro(args.micro),
+        }
+    finally:
+        server.terminate()
+        server.join()
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,55 @@
 ''' A `requests`-like library built on libcurl
 '''
 
-from .api import delete, get, head, options, patch, post, put, request
-from .exceptions import RequestException, RequestWarning
-from .models import PreparedRequest, Request, Response
-from .sessions import Session
-from .status_codes import codes
-from . import utils
+import sys
+
+# Everything is imported on first access (PEP 562), so that `import
+# curl_requests` stays cheap: pycurl (and with it asyncio and ssl) is
+# only loaded once something that needs it is used.
+_LAZY = {
+    'delete': 'api',
+    'get': 'api',
+    'head': 'api',
+    'options': 'api',
+    'patch': 'api',
+    'post': 'api',
+    'put': 'api',
+    'request': 'api',
+    'AsyncSession': 'async_sessions',
+    'Cache': 'cache',
+    'RequestException': 'exceptions',
+    'RequestWarning': 'exceptions',
+    'Metrics': 'metrics',
+    'PreparedRequest': 'models',
+    'Request': 'models',
+    'Response': 'models',
+    'Session': 'sessions',
+    'Share': 'share',
+    'codes': 'status_codes',
+}
+__all__ = sorted(_LAZY) + ['utils']
+
+# Submodules, e.g. for `curl_requests.api.reuse_connections = False`.
+_LAZY.update(dict.fromkeys([
+    '_enum', '_headers', '_upload', 'api', 'async_sessions', 'cache', 'exceptions', 'metrics',
+    'models', 'multi', 'pool', 'sessions', 'share', 'status_codes', 'streaming', 'structures', 'utils',
+]))
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name)) from None
+    # Not importlib.import_module(): importing importlib costs more than this.
+    qualname = '%s.%s' % (__name__, module or name)
+    __import__(qualname)
+    rv = sys.modules[qualname]
+    if module is not None:
+        rv = getattr(rv, name)
+    globals()[name] = rv
+    return rv
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -6,47 +6,72 @@ class ExtensibleEnumMeta(type):
         cls = type.__new__(mcls, name, bases, dct)
         cls._by_value = {}
         cls._by_name = {}
+        cls._name_by_value = {}
         return cls
 
     def __contains__(cls, idx):
         return idx in cls._by_value
 
     def __call__(cls, idx, name=None):
-        assert isinstance(idx, int)
-        assert name is None or isinstance(name, str)
-        try:
-            self = cls._by_value[idx]
-        except KeyError:
-            # Set self._name only on the first instance.
-            assert name not in cls._by_name
-            self = type.__call__(cls, idx, name)
-            cls._by_value[idx] = self
+        # Known values (the precomputed table) take a single lookup.
+        self = cls._by_value.get(idx)
+        if self is None:
+            assert isinstance(idx, int)
+            # Interned on first use; setdefault so racing threads agree.
+            self = cls._by_value.setdefault(idx, int.__new__(cls, idx))
+            # Set the repr() name only on the first instance.
+            cls._name_by_value.setdefault(idx, name)
         if name is not None:
-            self._names.add(name)
-            name = name.casefold()
-            name = name.replace(' ', '_').replace('-', '_').replace('\'', '')
-            if name not in cls._by_name:
-                cls._by_name[name] = self
-                setattr(cls, name.lower(), self)
-                setattr(cls, name.upper(), self)
+            assert isinstance(name, str)
+            cls._add_name(self, name)
         return self
 
+    def _add_name(cls, self, name):
+        name = name.casefold()
+        name = name.replace(' ', '_').replace('-', '_').replace('\'', '')
+        if name not in cls._by_name:
+            cls._by_name[name] = self
+            setattr(cls, name.lower(), self)
+            setattr(cls, name.upper(), self)
 
-class ExtensibleEnum(object):
-    def __init__(self, idx, name):
-        self._idx = idx
-        self._name = name
-        self._names = set()
+    def _extend(cls, table):
+        ''' Same as calling `cls(idx, name)` for each pair in `table`,
+            without the per-call cost.
+        '''
+        by_value = cls._by_value
+        for idx, name in table:
+            self = by_value.get(idx)
+            if self is None:
+                self = by_value[idx] = int.__new__(cls, idx)
+                cls._name_by_value[idx] = name
+            if name is not None:
+                cls._add_name(self, name)
+
+
+class ExtensibleEnum(int):
+    ''' An int with names; equal values are the same (interned) object.
+
+        Being an int, it compares, hashes and formats as its value.
+    '''
+    __slots__ = ()
+
+    @property
+    def _idx(self):
+        return int(self)
+
+    @property
+    def _name(self):
+        return self.__class__._name_by_value.get(self)
 
     def __repr__(self):
         cls = self.__class__
         cls_name = '%s.%s' % (cls.__module__, getattr(cls, '__qualname__', cls.__name__))
         if self._name is None:
-            return '<%s %d>' % (cls_name, self._idx)
-        return '<%s %d %s>' % (cls_name, self._idx, self._name)
-
-    def __eq__(self, other):
-        if isinstance(other, ExtensibleEnum):
-            other = other._idx
-        return self._idx == other
-ExtensibleEnum = ExtensibleEnumMeta(ExtensibleEnum.__name__, ExtensibleEnum.__bases__, dict(ExtensibleEnum.__dict__, __slots__ = ('_idx', '_name', '_names')))
+            return '<%s %d>' % (cls_name, self)
+        return '<%s %d %s>' % (cls_name, self, self._name)
+
+    __str__ = int.__repr__
+
+    def __reduce__(self):
+        return (self.__class__, (int(self),))
+ExtensibleEnum = ExtensibleEnumMeta(ExtensibleEnum.__name__, ExtensibleEnum.__bases__, dict(ExtensibleEnum.__dict__))
@@ -0,0 +1,47 @@
+# Parsing of the raw bytes that libcurl passes to HEADERFUNCTION.
+
+
+def last_block(raw):
+    ''' Return the last header block (status line included) of `raw`.
+
+        With redirects and informational responses, libcurl delivers
+        several blocks, each starting with its own status line.
+    '''
+    i = raw.rfind(b'\nHTTP/')
+    if i < 0:
+        return raw
+    return raw[i+1:]
+
+
+def parse_block(block):
+    ''' Parse one header block into its status line and a list of fields.
+
+        Field names and values are decoded as latin-1, so arbitrary bytes
+        survive. Repeated fields are kept separately, in order, and
+        obsolete line folding is replaced by a single space.
+    '''
+    lines = block.split(b'\n')
+    status_line = lines[0].rstrip(b'\r').decode('latin-1')
+    fields = []
+    for line in lines[1:]:
+        line = line.rstrip(b'\r')
+        if not line:
+            break
+        if line[:1] in (b' ', b'\t'):
+            if fields:
+                name, value = fields[-1]
+                fields[-1] = (name, value + ' ' + line.strip(b' \t').decode('latin-1'))
+            continue
+        name, _, value = line.partition(b':')
+        fields.append((name.rstrip(b' \t').decode('latin-1'), value.strip(b' \t').decode('latin-1')))
+    return status_line, fields
+
+
+def charset(content_type):
+    ''' Return the charset parameter of a Content-Type value, or None.
+    '''
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
@@ -0,0 +1,84 @@
+from collections.abc import Iterable, Mapping
+import io
+import os
+import stat
+
+
+class _BufferReader:
+    __slots__ = ('view', 'pos')
+
+    def __init__(self, data):
+        self.view = memoryview(data).cast('B')
+        self.pos = 0
+
+    def read(self, size):
+        start = self.pos
+        end = self.pos = min(start + size, len(self.view))
+        return self.view[start:end].tobytes()
+
+
+class _IterReader:
+    __slots__ = ('chunks', 'pending')
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = b''
+
+    def read(self, size):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return b''
+            if isinstance(chunk, str):
+                chunk = chunk.encode('ascii')
+            if not chunk:
+                continue # b'' would mean EOF to libcurl
+            if type(chunk) is bytes and len(chunk) <= size:
+                return chunk
+            self.pending = memoryview(chunk).cast('B')
+        chunk = self.pending[:size]
+        self.pending = self.pending[size:]
+        return chunk.tobytes()
+
+
+def _remaining(f):
+    try:
+        st = os.fstat(f.fileno())
+        if stat.S_ISREG(st.st_mode):
+            return st.st_size - f.tell()
+    except (AttributeError, OSError):
+        pass
+    try:
+        if f.seekable():
+            pos = f.tell()
+            end = f.seek(0, io.SEEK_END)
+            f.seek(pos)
+            return end - pos
+    except (AttributeError, OSError):
+        pass
+    return -1
+
+
+def upload_source(data):
+    ''' Return `(read, length)` to feed `data` to READFUNCTION.
+
+        `data` can be bytes, anything else supporting the buffer protocol
+        (bytearray, memoryview, mmap), a binary file object, or an iterable
+        of chunks; anything else (notably a dict) is a `TypeError`.
+        `length` is -1 when it can't be known up front. Nothing is read
+        until libcurl asks for it.
+    '''
+    if isinstance(data, bytes):
+        return io.BytesIO(data).read, len(data)
+    try:
+        reader = _BufferReader(data)
+    except TypeError:
+        pass
+    else:
+        return reader.read, len(reader.view)
+    if hasattr(data, 'read'):
+        return data.read, _remaining(data)
+    # A dict would otherwise be sent as its concatenated keys.
+    if isinstance(data, (Mapping, str)) or not isinstance(data, Iterable):
+        raise TypeError('Cannot send %s as a request body' % type(data).__name__)
+    return _IterReader(data).read, -1
@@ -1,9 +1,53 @@
+import os
+import threading
+
 from . import sessions
 
 
+# Set this to False to give every call its own short-lived `Session` again.
+reuse_connections = True
+
+# One default session per thread, so the handles are never shared.
+# A thread's session (and its connections) goes away with the thread.
+_local = threading.local()
+_forked = []
+
+
+def _default_session():
+    try:
+        return _local.session
+    except AttributeError:
+        session = _local.session = sessions.Session().__enter__()
+        return session
+
+
+def close_session():
+    ''' Close the current thread's default session, and its connections.
+
+        The next module-level call will open a new one.
+    '''
+    session = _local.__dict__.pop('session', None)
+    if session is not None:
+        session.__exit__(None, None, None)
+
+
+def _after_fork_in_child():
+    global _local
+    # The parent's connections must not be touched by the child, not even to
+    # close them (that could send a TLS close_notify on the parent's behalf).
+    _forked.append(_local)
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
 def request(method, url, stacklevel=1, **kwargs):
-    with sessions.Session() as session:
-        return session.request(method=method, url=url, stacklevel=stacklevel+1, **kwargs)
+    if not reuse_connections:
+        with sessions.Session() as session:
+            return session.request(method=method, url=url, stacklevel=stacklevel+1, **kwargs)
+    return _default_session().request(method=method, url=url, stacklevel=stacklevel+1, **kwargs)
 
 
 def delete(url, stacklevel=1, **kwargs):
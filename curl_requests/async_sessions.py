@@ -0,0 +1,256 @@
+import asyncio
+import collections
+
+import pycurl
+
+from .exceptions import RequestException
+from .models import Request
+from .multi import _host_key
+from .sessions import Session, _FileBody
+
+
+class _AsyncEngine:
+    ''' Drive transfers on one `pycurl.CurlMulti` from an asyncio event loop.
+
+        libcurl tells us which sockets to watch (M_SOCKETFUNCTION) and
+        when to time out (M_TIMERFUNCTION); we forward readiness back
+        with `socket_action`. No threads are involved.
+    '''
+    __slots__ = ('loop', 'new_curl', 'multi', 'idle', 'active', 'timer', 'readers', 'writers')
+
+    def __init__(self, loop, new_curl):
+        self.loop = loop
+        self.new_curl = new_curl
+        self.multi = pycurl.CurlMulti()
+        # Let transfers to the same host share an HTTP/2 connection.
+        self.multi.setopt(pycurl.M_PIPELINING, pycurl.PIPE_MULTIPLEX)
+        self.idle = []
+        self.active = {} # curl -> (future, _Transfer)
+        self.timer = None
+        self.readers = set()
+        self.writers = set()
+        self.multi.setopt(pycurl.M_SOCKETFUNCTION, self._on_socket)
+        self.multi.setopt(pycurl.M_TIMERFUNCTION, self._on_timer)
+
+    def close(self):
+        for c, (fut, xfer) in list(self.active.items()):
+            self.multi.remove_handle(c)
+            c.close()
+            if not fut.done():
+                fut.cancel()
+        self.active.clear()
+        for c in self.idle:
+            c.close()
+        self.idle = []
+        self._on_timer(-1)
+        for fd in self.readers:
+            self.loop.remove_reader(fd)
+        for fd in self.writers:
+            self.loop.remove_writer(fd)
+        self.readers.clear()
+        self.writers.clear()
+        self.multi.close()
+
+    def _on_socket(self, what, fd, multi, socketp):
+        # Always start from scratch: libcurl may have closed the socket and
+        # reused its fd number, which leaves a stale registration behind.
+        loop = self.loop
+        if fd in self.readers:
+            loop.remove_reader(fd)
+            self.readers.discard(fd)
+        if fd in self.writers:
+            loop.remove_writer(fd)
+            self.writers.discard(fd)
+        if what in (pycurl.POLL_IN, pycurl.POLL_INOUT):
+            loop.add_reader(fd, self._on_ready, fd, pycurl.CSELECT_IN)
+            self.readers.add(fd)
+        if what in (pycurl.POLL_OUT, pycurl.POLL_INOUT):
+            loop.add_writer(fd, self._on_ready, fd, pycurl.CSELECT_OUT)
+            self.writers.add(fd)
+
+    def _on_timer(self, timeout_ms):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if timeout_ms >= 0:
+            self.timer = self.loop.call_later(timeout_ms / 1000, self._on_ready, pycurl.SOCKET_TIMEOUT, 0)
+
+    def _on_ready(self, fd, ev_bitmask):
+        if fd == pycurl.SOCKET_TIMEOUT:
+            self.timer = None
+        self.multi.socket_action(fd, ev_bitmask)
+        self._check_done()
+
+    def _check_done(self):
+        while True:
+            num_q, ok_list, err_list = self.multi.info_read()
+            for c in ok_list:
+                self._done(c, None)
+            for c, errno, errmsg in err_list:
+                self._done(c, pycurl.error(errno, errmsg))
+            if not num_q:
+                break
+
+    def _done(self, c, error):
+        fut, xfer = self.active.pop(c)
+        self.multi.remove_handle(c)
+        try:
+            resp = xfer.finish(error)
+        except RequestException as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(resp)
+        finally:
+            c.detach()
+            self.idle.append(c)
+
+    async def perform(self, setup):
+        ''' Set up an idle easy handle with `setup(c)`, then await its `Response`.
+        '''
+        c = self.idle.pop() if self.idle else self.new_curl()
+        try:
+            xfer = setup(c)
+        except BaseException:
+            c.detach()
+            self.idle.append(c)
+            raise
+        fut = self.loop.create_future()
+        self.active[c] = (fut, xfer)
+        self.multi.add_handle(c)
+        try:
+            return await fut
+        finally:
+            # Beware: once done, `c` may already be in use by another request.
+            if self.active.get(c, (None, None))[0] is fut:
+                # cancelled while still in flight
+                del self.active[c]
+                self.multi.remove_handle(c)
+                c.detach()
+                self.idle.append(c)
+
+
+class AsyncSession(Session):
+    ''' Like `Session`, but every request method is a coroutine.
+
+        All transfers of a session share one event loop and one libcurl
+        connection cache. Use as `async with AsyncSession() as sess:`.
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        raise TypeError('use "async with" for %s' % self.__class__.__name__)
+
+    async def __aenter__(self):
+        self._pool = None
+        self._engine = _AsyncEngine(asyncio.get_event_loop(), self._new_curl)
+        return self
+
+    async def __aexit__(self, ty, v, tb):
+        self._engine.close()
+        del self._engine
+        del self._pool
+
+    async def request(self, method, url, *, stacklevel=1, **kwargs):
+        if not self._hooks:
+            return await self._request(method, url, stacklevel=stacklevel+1, **kwargs)
+        req = Request(method, url, **kwargs)
+        self._emit('before_send', req)
+        try:
+            resp = await self._request(req.method, req.url, stacklevel=stacklevel+1, **req.kwargs)
+        except RequestException as e:
+            self._emit('error', req, e)
+            raise
+        self._emit('response', req, resp)
+        return resp
+
+    async def _request(self, method, url, *, stacklevel=1, **kwargs):
+        lookup = None
+        if self.cache is not None:
+            lookup = self._cache_lookup(method, url, kwargs)
+            if lookup is not None:
+                if lookup.response is not None:
+                    return lookup.response
+                kwargs['_headers'] = lookup.headers
+        resp = await self._engine.perform(lambda c: self._setup(c, method, url, stacklevel=stacklevel+2, **kwargs))
+        if lookup is not None:
+            resp = self.cache.store(lookup, resp)
+        return resp
+
+    async def download(self, url, file, *, atomic=True, preallocate=False, stacklevel=1, **kwargs):
+        ''' See `Session.download`.
+        '''
+        assert kwargs.get('into') is None
+        body = _FileBody(file, atomic=atomic, preallocate=preallocate)
+        try:
+            resp = await self.request('get', url, _sink=body, stacklevel=stacklevel+1, **kwargs)
+        except BaseException:
+            body.abort()
+            raise
+        body.commit(resp.status_code < 400)
+        return resp
+
+    async def gather(self, requests, *, max_connections=10, max_per_host=None, return_exceptions=False, stacklevel=1):
+        ''' Perform many `Request`s concurrently, yielding `(index, response)` as each completes.
+
+            This is an async generator; see `Session.gather` for the arguments.
+        '''
+        total = asyncio.Semaphore(max_connections)
+        hosts = collections.defaultdict(lambda: asyncio.Semaphore(max_per_host))
+
+        async def one(req):
+            assert isinstance(req, Request), req
+            async with total:
+                if max_per_host is None:
+                    return await self.request(req.method, req.url, stacklevel=stacklevel+1, **req.kwargs)
+                async with hosts[_host_key(req.url)]:
+                    return await self.request(req.method, req.url, stacklevel=stacklevel+1, **req.kwargs)
+
+        indices = {asyncio.ensure_future(one(req)): i for i, req in enumerate(requests)}
+        pending = set(indices)
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    try:
+                        resp = task.result()
+                    except RequestException as e:
+                        if not return_exceptions:
+                            raise
+                        resp = e
+                    yield indices[task], resp
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def map(self, requests, stacklevel=1, **kwargs):
+        ''' Like `gather`, but return a list of responses in the order of `requests`.
+        '''
+        requests = list(requests)
+        rv = [None] * len(requests)
+        async for i, resp in self.gather(requests, stacklevel=stacklevel+1, **kwargs):
+            rv[i] = resp
+        return rv
+
+    async def delete(self, url, stacklevel=1, **kwargs):
+        return await self.request('delete', url, stacklevel=stacklevel+1, **kwargs)
+
+    async def get(self, url, stacklevel=1, **kwargs):
+        return await self.request('get', url, stacklevel=stacklevel+1, **kwargs)
+
+    async def head(self, url, stacklevel=1, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return await self.request('head', url, stacklevel=stacklevel+1, **kwargs)
+
+    async def options(self, url, stacklevel=1, **kwargs):
+        return await self.request('options', url, stacklevel=stacklevel+1, **kwargs)
+
+    async def patch(self, url, data=None, stacklevel=1, **kwargs):
+        return await self.request('patch', url,  data=data, stacklevel=stacklevel+1, **kwargs)
+
+    async def post(self, url, data=None, json=None, stacklevel=1, **kwargs):
+        return await self.request('post', url, data=data, json=json, stacklevel=stacklevel+1, **kwargs)
+
+    async def put(self, url, data=None, stacklevel=1, **kwargs):
+        return await self.request('put', url, data=data, stacklevel=stacklevel+1, **kwargs)
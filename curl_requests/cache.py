@@ -0,0 +1,324 @@
+import collections
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from ._headers import last_block, parse_block
+from .models import Response
+from .status_codes import codes
+
+
+# Statuses that may be cached without explicit freshness (RFC 9110 15.1).
+_HEURISTIC_STATUSES = frozenset({200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501})
+# Fields of a 304 that must not overwrite the stored response's.
+_KEEP_FIELDS = frozenset({'content-length', 'content-encoding', 'transfer-encoding'})
+_SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE'})
+
+
+def _directives(value):
+    ''' Parse a Cache-Control value into a dict; valueless directives map to None.
+    '''
+    rv = {}
+    for part in value.split(','):
+        name, eq, arg = part.partition('=')
+        name = name.strip().lower()
+        if name:
+            rv[name] = arg.strip().strip('"') if eq else None
+    return rv
+
+
+def _seconds(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _http_date(value):
+    if value is None:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _field(fields, name):
+    for k, v in fields:
+        if k.lower() == name:
+            return v
+    return None
+
+
+class _Entry:
+    ''' A stored response: the final header block and the body.
+    '''
+    __slots__ = ('url', 'status_line', 'fields', 'body', 'response_time', 'vary', 'private')
+
+    def __init__(self, url, status_line, fields, body, response_time, vary, private):
+        self.url = url # the effective URL
+        self.status_line = status_line
+        self.fields = fields
+        self.body = body
+        self.response_time = response_time
+        self.vary = vary # request header name -> value it was sent with
+        self.private = private
+
+    def status(self):
+        return int(self.status_line.split(None, 2)[1])
+
+    def lifetime(self, shared):
+        cc = _directives(_field(self.fields, 'cache-control') or '')
+        if 'no-cache' in cc:
+            return 0
+        if shared and _seconds(cc.get('s-maxage')) is not None:
+            return _seconds(cc['s-maxage'])
+        if _seconds(cc.get('max-age')) is not None:
+            return _seconds(cc['max-age'])
+        date = _http_date(_field(self.fields, 'date')) or self.response_time
+        expires = _field(self.fields, 'expires')
+        if expires is not None:
+            # An invalid Expires means "already expired".
+            return max((_http_date(expires) or 0) - date, 0)
+        last_modified = _http_date(_field(self.fields, 'last-modified'))
+        if last_modified is not None and self.status() in _HEURISTIC_STATUSES:
+            return max(date - last_modified, 0) / 10
+        return 0
+
+    def age(self, now):
+        date = _http_date(_field(self.fields, 'date'))
+        apparent = 0 if date is None else max(self.response_time - date, 0)
+        initial = max(apparent, _seconds(_field(self.fields, 'age')) or 0)
+        return initial + now - self.response_time
+
+    def validators(self):
+        headers = []
+        etag = _field(self.fields, 'etag')
+        if etag is not None:
+            headers.append('If-None-Match: ' + etag)
+        last_modified = _field(self.fields, 'last-modified')
+        if last_modified is not None:
+            headers.append('If-Modified-Since: ' + last_modified)
+        return tuple(headers)
+
+    def raw_headers(self):
+        lines = [self.status_line]
+        lines.extend('%s: %s' % field for field in self.fields)
+        lines.append('\r\n')
+        return '\r\n'.join(lines).encode('latin-1')
+
+    def response(self, json_loads):
+        resp = Response()
+        resp.url = self.url
+        resp._body = self.body
+        resp._raw_headers = self.raw_headers()
+        resp._json_loads = json_loads
+        resp.status_code = codes(self.status())
+        return resp
+
+    def freshen(self, fields, response_time):
+        ''' Update the stored fields from those of a 304 (RFC 9111 4.3.4).
+        '''
+        names = {k.lower() for k, v in fields} - _KEEP_FIELDS
+        self.fields = [f for f in self.fields if f[0].lower() not in names]
+        self.fields.extend(f for f in fields if f[0].lower() in names)
+        self.response_time = response_time
+
+    def dump(self, f):
+        meta = {
+            'url': self.url,
+            'status_line': self.status_line,
+            'fields': self.fields,
+            'response_time': self.response_time,
+            'vary': self.vary,
+        }
+        f.write(json.dumps(meta).encode('utf-8') + b'\n')
+        f.write(self.body)
+
+    @classmethod
+    def load(cls, f):
+        meta = json.loads(f.readline())
+        fields = [tuple(field) for field in meta['fields']]
+        return cls(meta['url'], meta['status_line'], fields, f.read(), meta['response_time'], meta['vary'], False)
+
+
+class _Lookup:
+    ''' The cache's view of one request, from `Cache.lookup` to `Cache.store`.
+
+        If `response` is set, it is fresh and no request is needed;
+        otherwise the request is sent with the extra `headers`.
+    '''
+    __slots__ = ('method', 'url', 'entry', 'vary_source', 'json_loads', 'response', 'headers')
+
+    def __init__(self, method, url, entry, vary_source, json_loads):
+        self.method = method
+        self.url = url
+        self.entry = entry
+        self.vary_source = vary_source
+        self.json_loads = json_loads
+        self.response = None
+        self.headers = ()
+
+
+class Cache:
+    ''' An HTTP cache (RFC 9111) for GET responses, for `Session(cache=...)`.
+
+        Up to `maxsize` responses are kept in memory, least recently used
+        first out. With `directory`, responses are also stored on disk
+        there (one file per URL), and survive the process; as the disk
+        store may be shared, responses marked `private` are only kept in
+        memory. Fresh responses are served without a request; stale ones
+        are revalidated with If-None-Match/If-Modified-Since, and a 304
+        then serves the stored response. Responses with `no-store` (or
+        `Vary: *`) are never stored.
+    '''
+    __slots__ = ('maxsize', 'directory', '_lock', '_memory', 'hits', 'misses', 'revalidations')
+
+    def __init__(self, maxsize=256, *, directory=None):
+        assert maxsize >= 1
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict() # url -> _Entry
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def stats(self):
+        ''' Return a snapshot of the counters.
+        '''
+        with self._lock:
+            return {
+                'size': len(self._memory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.entry'):
+                    os.unlink(os.path.join(self.directory, name))
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.entry')
+
+    def _get(self, url):
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is not None:
+                self._memory.move_to_end(url)
+                return entry
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(url), 'rb') as f:
+                entry = _Entry.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(url, entry)
+        return entry
+
+    def _remember(self, url, entry):
+        with self._lock:
+            self._memory[url] = entry
+            self._memory.move_to_end(url)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _put(self, url, entry):
+        self._remember(url, entry)
+        if self.directory is None or entry.private:
+            return
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with open(fd, 'wb') as f:
+                entry.dump(f)
+            os.replace(tmp, self._path(url))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def invalidate(self, url):
+        with self._lock:
+            self._memory.pop(url, None)
+        if self.directory is not None:
+            try:
+                os.unlink(self._path(url))
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, method, url, vary_source, json_loads):
+        ''' Start a request; see `_Lookup`.
+
+            `vary_source` maps (lowercase) request header names to the
+            values the request is sent with, for matching Vary.
+        '''
+        lookup = _Lookup(method, url, None, vary_source, json_loads)
+        if method != 'GET':
+            return lookup
+        entry = self._get(url)
+        if entry is not None and all(vary_source.get(k) == v for k, v in entry.vary.items()):
+            if entry.age(time.time()) < entry.lifetime(self.directory is not None):
+                with self._lock:
+                    self.hits += 1
+                lookup.response = entry.response(json_loads)
+                return lookup
+            lookup.entry = entry
+            lookup.headers = entry.validators()
+        return lookup
+
+    def store(self, lookup, resp):
+        ''' Finish a request: return the `Response` to use in place of `resp`.
+        '''
+        method = lookup.method
+        url = lookup.url
+        status = resp.status_code
+        if method not in _SAFE_METHODS:
+            if status < 400:
+                self.invalidate(url)
+            return resp
+        if method != 'GET':
+            return resp
+        if resp.history:
+            # Under the request URL, the final response would stand in
+            # for the redirect, which may not be cacheable at all.
+            with self._lock:
+                self.misses += 1
+            return resp
+        now = time.time()
+        status_line, fields = parse_block(last_block(resp._raw_headers))
+        if status == 304 and lookup.entry is not None:
+            entry = lookup.entry
+            entry.freshen(fields, now)
+            self._put(url, entry)
+            with self._lock:
+                self.revalidations += 1
+            return entry.response(lookup.json_loads)
+        with self._lock:
+            self.misses += 1
+        body = resp.content
+        if body is None or status in (206, 304):
+            return resp
+        cc = _directives(_field(fields, 'cache-control') or '')
+        vary = _field(fields, 'vary')
+        if 'no-store' in cc or (vary is not None and vary.strip() == '*'):
+            return resp
+        names = [] if vary is None else [v.strip().lower() for v in vary.split(',') if v.strip()]
+        entry = _Entry(resp.url, status_line, fields, body, now, {k: lookup.vary_source.get(k) for k in names}, 'private' in cc)
+        explicit = 'max-age' in cc or 'public' in cc or _field(fields, 'expires') is not None
+        if status not in _HEURISTIC_STATUSES and not explicit:
+            return resp
+        if entry.lifetime(self.directory is not None) <= 0 and not entry.validators():
+            return resp # useless
+        self._put(url, entry)
+        return resp
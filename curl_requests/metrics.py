@@ -0,0 +1,98 @@
+import bisect
+import threading
+import urllib.parse
+
+
+# Upper bounds (in seconds) of the latency buckets, as Prometheus does it.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self, nbuckets):
+        self.counts = [0] * (nbuckets + 1) # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class Metrics:
+    ''' Aggregate the requests of one or more sessions, via their hooks.
+
+        Keeps a fixed-bucket latency histogram per host and method,
+        counts of responses by status code and of errors by pycurl error
+        code, and how many responses came over a reused connection.
+        Use `attach(session)`, and read it all with `snapshot()`.
+    '''
+    __slots__ = ('buckets', '_lock', '_latency', '_statuses', '_errors', 'responses', 'reused')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._latency = {} # (host, method) -> _Histogram
+        self._statuses = {} # status code -> count
+        self._errors = {} # pycurl error code (None if unknown) -> count
+        self.responses = 0
+        self.reused = 0
+
+    def attach(self, session):
+        session.add_hook('response', self.on_response)
+        session.add_hook('error', self.on_error)
+
+    def detach(self, session):
+        session.remove_hook('response', self.on_response)
+        session.remove_hook('error', self.on_error)
+
+    def on_response(self, request, response):
+        timings = response.timings
+        if timings is None:
+            return # e.g. from the cache; nothing was sent
+        key = (urllib.parse.urlsplit(request.url).netloc, request.method.upper())
+        i = bisect.bisect_left(self.buckets, timings.total)
+        with self._lock:
+            hist = self._latency.get(key)
+            if hist is None:
+                hist = self._latency[key] = _Histogram(len(self.buckets))
+            hist.counts[i] += 1
+            hist.count += 1
+            hist.sum += timings.total
+            status = response.status_code
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            self.responses += 1
+            if response.stats.num_connects == 0:
+                self.reused += 1
+
+    def on_error(self, request, exc):
+        cause = exc.__cause__
+        code = cause.args[0] if cause is not None and cause.args else None
+        with self._lock:
+            self._errors[code] = self._errors.get(code, 0) + 1
+
+    def snapshot(self):
+        ''' Return everything as plain dicts, lists and numbers.
+
+            Bucket counts are cumulative, keyed by their upper bound
+            (as a string, with '+Inf' last), ready for an exporter.
+        '''
+        bounds = [repr(b) for b in self.buckets] + ['+Inf']
+        with self._lock:
+            latency = {}
+            for (host, method), hist in self._latency.items():
+                cumulative = []
+                total = 0
+                for n in hist.counts:
+                    total += n
+                    cumulative.append(total)
+                latency.setdefault(host, {})[method] = {
+                    'buckets': dict(zip(bounds, cumulative)),
+                    'count': hist.count,
+                    'sum': hist.sum,
+                }
+            return {
+                'latency': latency,
+                'statuses': {int(k): v for k, v in self._statuses.items()},
+                'errors': dict(self._errors),
+                'responses': self.responses,
+                'reused_connections': self.reused,
+                'connection_reuse_ratio': self.reused / self.responses if self.responses else 0.0,
+            }
@@ -1,8 +1,41 @@
+import collections
+import datetime
+import io
 import json
 
+from ._headers import charset, last_block, parse_block
+from .structures import HTTPHeaders
+
+
+_UNPARSED = object()
+
+
+# Seconds from the start of the request until each phase was done, as
+# reported by libcurl; `redirect` is the part of `total` spent on redirects.
+Timings = collections.namedtuple('Timings', 'namelookup connect appconnect pretransfer starttransfer total redirect')
+# Body bytes received and sent, average download speed (bytes/s), and the
+# number of new connections made (0 when an existing one was reused).
+TransferStats = collections.namedtuple('TransferStats', 'downloaded uploaded download_speed num_connects')
+# One redirect that was followed: its status, the URL that answered, the
+# Location it pointed to, its headers, and the time (a timedelta) from the
+# previous hop (or the start of the request) until its headers were in.
+Hop = collections.namedtuple('Hop', 'status_code url location headers elapsed')
+
 
 class Request:
-    __slots__ = ()
+    ''' A request that has not been performed yet, e.g. for `Session.map`.
+
+        `kwargs` are passed on to `Session.request`.
+    '''
+    __slots__ = ('method', 'url', 'kwargs')
+
+    def __init__(self, method=None, url=None, **kwargs):
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return '<%s [%s %s]>' % (self.__class__.__name__, self.method, self.url)
 
 
 class PreparedRequest:
@@ -10,11 +43,148 @@ class PreparedRequest:
 
 
 class Response:
-    __slots__ = ('content', 'headers', 'status_code')
+    __slots__ = (
+        '_body', '_encoding', '_headers', '_json', '_json_loads', '_raw_headers', '_text',
+        'elapsed', 'history', 'http_version', 'raw', 'stats', 'status_code', 'timings', 'url',
+    )
+
+    def __init__(self):
+        self._body = None
+        self._encoding = None
+        self._text = None
+        self._headers = None
+        self._json = _UNPARSED
+        self._json_loads = json.loads
+        self._raw_headers = b''
+        self.raw = None
+        # Set from libcurl once the headers are in; see `Timings` and `TransferStats`.
+        self.url = None
+        self.http_version = None # e.g. 'HTTP/1.1' or 'HTTP/2'
+        self.elapsed = datetime.timedelta(0)
+        self.timings = None
+        self.stats = None
+        self.history = () # the `Hop`s of redirects followed, oldest first
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ty, v, tb):
+        self.close()
+
+    def close(self):
+        ''' Release the connection of a streaming response without reading the rest.
+        '''
+        if self.raw is not None:
+            self.raw.close()
+
+    @property
+    def headers(self):
+        ''' The `HTTPHeaders` of the final response, parsed on first access.
+        '''
+        if self._headers is None:
+            status_line, fields = parse_block(last_block(self._raw_headers))
+            self._headers = HTTPHeaders(fields)
+        return self._headers
+
+    def _get_body(self):
+        body = self._body
+        if body is None and self.raw is not None:
+            with self.raw:
+                body = self._body = self.raw.read()
+        return body
+
+    @property
+    def body(self):
+        ''' The body as a memoryview of the receive buffer, without copying.
+        '''
+        body = self._get_body()
+        if body is None:
+            return None
+        return memoryview(body)
+
+    @property
+    def content(self):
+        ''' The body as bytes (copied from the receive buffer once, on first access).
+        '''
+        body = self._get_body()
+        if body is not None and type(body) is not bytes:
+            body = self._body = bytes(body)
+        return body
+
+    @property
+    def encoding(self):
+        ''' The encoding of `text`: the Content-Type charset, else utf-8.
+
+            Setting it makes `text` decode the body again.
+        '''
+        if self._encoding is None:
+            self._encoding = charset(self.headers.get('Content-Type', '')) or 'utf-8'
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, value):
+        self._encoding = value
+        self._text = None
 
     @property
     def text(self):
-        return self.content.decode('utf-8')
+        ''' The body decoded with `encoding`, on first access.
+        '''
+        if self._text is None:
+            body = self._get_body()
+            if body is None:
+                return None
+            try:
+                self._text = str(body, self.encoding, 'replace')
+            except LookupError:
+                self._text = str(body, 'utf-8', 'replace')
+        return self._text
 
     def json(self):
-        return json.loads(self.text)
+        ''' Parse the body as JSON, straight from bytes; the result is cached.
+        '''
+        if self._json is _UNPARSED:
+            body = self._get_body()
+            if isinstance(body, memoryview):
+                body = body.tobytes()
+            self._json = self._json_loads(body)
+        return self._json
+
+    def iter_content(self, chunk_size=io.DEFAULT_BUFFER_SIZE):
+        ''' Iterate over the body in chunks of at most `chunk_size` bytes.
+
+            For a streaming response, at most about `chunk_size` bytes
+            are buffered at a time.
+        '''
+        if self._body is not None or self.raw is None:
+            content = self.content
+            for i in range(0, len(content), chunk_size):
+                yield content[i:i+chunk_size]
+            return
+        raw = self.raw
+        raw.limit = chunk_size
+        with raw:
+            while True:
+                chunk = raw.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iter_lines(self, chunk_size=512, delimiter=None):
+        ''' Iterate over the body one line at a time, without line endings.
+        '''
+        pending = None
+        for chunk in self.iter_content(chunk_size):
+            if pending is not None:
+                chunk = pending + chunk
+            if delimiter is None:
+                lines = chunk.splitlines()
+            else:
+                lines = chunk.split(delimiter)
+            if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+                pending = lines.pop()
+            else:
+                pending = None
+            yield from lines
+        if pending is not None:
+            yield pending
@@ -0,0 +1,158 @@
+import collections
+import urllib.parse
+
+import pycurl
+
+from .exceptions import RequestException
+from .models import Request
+
+
+def _host_key(url):
+    bits = urllib.parse.urlsplit(url)
+    return (bits.scheme, bits.netloc)
+
+
+# Returned by the `finish` callback of `drive` to run an item again.
+RETRY = object()
+
+
+def drive(multi, waiting, max_connections, max_per_host, start, finish, release):
+    ''' Run the transfers queued in `waiting` on `multi`, yielding as they finish.
+
+        `waiting` maps each host to a deque of items; hosts are served in
+        order of first appearance, and within a host, FIFO. `start(item)`
+        returns an easy handle set up for the item. Once its transfer is
+        done (and the handle removed from `multi`), `finish(c, item, error)`
+        returns what to yield, or `RETRY` to queue the item again, first
+        for its host. `start` and `finish` own the handle; `release(c)` is
+        only called for the handles still active when this is closed.
+    '''
+    active = {} # curl -> (host, item)
+    per_host = collections.Counter()
+    try:
+        while active or waiting:
+            for host in list(waiting):
+                queue = waiting[host]
+                while queue and len(active) < max_connections and (max_per_host is None or per_host[host] < max_per_host):
+                    item = queue.popleft()
+                    c = start(item)
+                    multi.add_handle(c)
+                    active[c] = (host, item)
+                    per_host[host] += 1
+                if not queue:
+                    del waiting[host]
+                if len(active) >= max_connections:
+                    break
+            while True:
+                ret, num_handles = multi.perform()
+                if ret != pycurl.E_CALL_MULTI_PERFORM:
+                    break
+            done = []
+            while True:
+                num_q, ok_list, err_list = multi.info_read()
+                for c in ok_list:
+                    done.append((c, None))
+                for c, errno, errmsg in err_list:
+                    done.append((c, pycurl.error(errno, errmsg)))
+                if not num_q:
+                    break
+            finished = []
+            for c, error in done:
+                host, item = active.pop(c)
+                per_host[host] -= 1
+                multi.remove_handle(c)
+                rv = finish(c, item, error)
+                if rv is RETRY:
+                    waiting.setdefault(host, collections.deque()).appendleft(item)
+                else:
+                    finished.append(rv)
+            for rv in finished:
+                yield rv
+            if active and not done:
+                multi.select(1.0)
+    finally:
+        for c in active:
+            multi.remove_handle(c)
+            release(c)
+        active.clear()
+
+
+class _Engine:
+    ''' Drive many transfers concurrently on one `pycurl.CurlMulti`.
+
+        The multi handle (and thus its connection cache) and the idle
+        easy handles outlive a single run, so that consecutive batches
+        against the same hosts keep their connections warm.
+    '''
+    __slots__ = ('new_curl', 'multi', 'idle')
+
+    def __init__(self, new_curl):
+        self.new_curl = new_curl
+        self.multi = pycurl.CurlMulti()
+        # Let transfers to the same host share an HTTP/2 connection.
+        self.multi.setopt(pycurl.M_PIPELINING, pycurl.PIPE_MULTIPLEX)
+        self.idle = []
+
+    def close(self):
+        for c in self.idle:
+            c.close()
+        self.idle = []
+        self.multi.close()
+
+    def _checkout(self):
+        if self.idle:
+            return self.idle.pop()
+        return self.new_curl()
+
+    def _checkin(self, c):
+        c.detach()
+        self.idle.append(c)
+
+    def run(self, session, requests, *, max_connections, max_per_host, return_exceptions, stacklevel=1):
+        assert max_connections >= 1
+        assert max_per_host is None or max_per_host >= 1
+        waiting = collections.OrderedDict() # see `drive`
+        for i, req in enumerate(requests):
+            assert isinstance(req, Request), req
+            waiting.setdefault(_host_key(req.url), collections.deque()).append((i, req))
+        return self._run(session, waiting, max_connections, max_per_host, return_exceptions, stacklevel+1)
+
+    def _run(self, session, waiting, max_connections, max_per_host, return_exceptions, stacklevel):
+        transfers = {} # curl -> _Transfer
+        hooks = session._hooks
+
+        def start(item):
+            i, req = item
+            if hooks:
+                session._emit('before_send', req)
+            c = self._checkout()
+            try:
+                transfers[c] = session._setup(c, req.method, req.url, stacklevel=stacklevel+2, **req.kwargs)
+            except BaseException:
+                self._checkin(c)
+                raise
+            return c
+
+        def finish(c, item, error):
+            i, req = item
+            xfer = transfers.pop(c)
+            try:
+                resp = xfer.finish(error)
+            except RequestException as e:
+                if hooks:
+                    session._emit('error', req, e)
+                if not return_exceptions:
+                    raise
+                resp = e
+            else:
+                if hooks:
+                    session._emit('response', req, resp)
+            finally:
+                self._checkin(c)
+            return i, resp
+
+        def release(c):
+            del transfers[c]
+            self._checkin(c)
+
+        return drive(self.multi, waiting, max_connections, max_per_host, start, finish, release)
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from .exceptions import RequestException
+
+
+class HandlePool:
+    ''' A bounded, thread-safe pool of easy handles.
+
+        A handle is checked out for one request at a time, and returned
+        to the pool (with its connection cache intact) afterwards.
+        The pool does not touch the options of the handles.
+
+        When all `maxsize` handles are in use, `acquire` either waits for
+        one to come back (if `block`, up to `timeout` seconds), or hands
+        out an overflow handle that is closed on release.
+    '''
+    __slots__ = (
+        '_new_curl', 'maxsize', 'block', 'timeout',
+        '_cond', '_idle', '_size', '_overflow', '_closed',
+        'checkouts', 'contended', 'overflows', 'wait_time', 'max_wait_time',
+    )
+
+    def __init__(self, new_curl, maxsize=1, *, block=False, timeout=None):
+        assert maxsize >= 1
+        self._new_curl = new_curl
+        self.maxsize = maxsize
+        self.block = block
+        self.timeout = timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._size = 0 # pooled handles, whether idle or in use
+        self._overflow = set()
+        self._closed = False
+        self.checkouts = 0
+        self.contended = 0
+        self.overflows = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self):
+        with self._cond:
+            assert not self._closed
+            self.checkouts += 1
+            if not self._idle and self._size >= self.maxsize:
+                self.contended += 1
+                if not self.block:
+                    self.overflows += 1
+                    c = self._new_curl()
+                    self._overflow.add(c)
+                    return c
+                self._wait()
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+        try:
+            return self._new_curl()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _wait(self):
+        start = time.monotonic()
+        deadline = None if self.timeout is None else start + self.timeout
+        try:
+            while not self._idle and self._size >= self.maxsize:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RequestException('Timed out waiting for a free handle')
+                self._cond.wait(remaining)
+        finally:
+            waited = time.monotonic() - start
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def release(self, c):
+        with self._cond:
+            if c in self._overflow:
+                self._overflow.remove(c)
+                c.close()
+            elif self._closed:
+                self._size -= 1
+                c.close()
+            else:
+                self._idle.append(c)
+                self._cond.notify()
+
+    def close(self):
+        ''' Close the idle handles now, and the others as they are released.
+        '''
+        with self._cond:
+            self._closed = True
+            for c in self._idle:
+                c.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        ''' Return a snapshot of the pool's counters, for sizing it.
+        '''
+        with self._cond:
+            return {
+                'maxsize': self.maxsize,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle) + len(self._overflow),
+                'checkouts': self.checkouts,
+                'contended': self.contended,
+                'overflows': self.overflows,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+            }
@@ -1,13 +1,44 @@
+import datetime
 import io
+import json as _json
+import os
+import time
 import urllib.parse
 import warnings
 
 import pycurl
 
+from ._headers import parse_block
+from ._upload import upload_source
 from .exceptions import RequestException, RequestWarning
-from .models import Response
+from .models import Hop, Request, Response, Timings, TransferStats
+from .pool import HandlePool
 from .status_codes import codes
-from .structures import CaseInsensitiveDict
+from .streaming import RawStream, perform
+from .structures import HTTPHeaders
+
+
+# Never trust a Content-Length beyond this for preallocation.
+_PREALLOCATE_MAX = 64 << 20
+
+_TIMING_INFOS = (
+    pycurl.NAMELOOKUP_TIME, pycurl.CONNECT_TIME, pycurl.APPCONNECT_TIME, pycurl.PRETRANSFER_TIME,
+    pycurl.STARTTRANSFER_TIME, pycurl.TOTAL_TIME, pycurl.REDIRECT_TIME,
+)
+_STATS_INFOS = (pycurl.SIZE_DOWNLOAD_T, pycurl.SIZE_UPLOAD_T, pycurl.SPEED_DOWNLOAD_T, pycurl.NUM_CONNECTS)
+
+_HOOK_EVENTS = frozenset({'before_send', 'response', 'error'})
+
+_HTTP_VERSIONS = {
+    pycurl.CURL_HTTP_VERSION_1_0: 'HTTP/1.0',
+    pycurl.CURL_HTTP_VERSION_1_1: 'HTTP/1.1',
+    pycurl.CURL_HTTP_VERSION_2_0: 'HTTP/2',
+    pycurl.CURL_HTTP_VERSION_3: 'HTTP/3',
+}
+
+
+def _json_dumps(obj):
+    return _json.dumps(obj).encode('utf-8')
 
 
 def _add_params(url, params):
@@ -23,96 +54,640 @@ def _add_params(url, params):
     return urllib.parse.urlunparse(bits)
 
 
+class _Easy(pycurl.Curl):
+    ''' An easy handle that remembers which options are set on it.
+
+        The callbacks are installed once per handle, and dispatch to
+        whatever the current transfer assigns to `write`, `header` and `read`.
+
+        `multi` is the handle's own multi handle, created by its first
+        `stream=True` request. It holds the connections from then on, so
+        all later transfers of the handle run on it.
+    '''
+    __slots__ = ('applied', 'write', 'header', 'read', 'multi')
+
+    def __init__(self):
+        super().__init__()
+        self.applied = None # unknown: reset() before use
+        self.multi = None
+        self.detach()
+
+    def close(self):
+        if self.multi is not None:
+            self.multi.close()
+            self.multi = None
+        super().close()
+
+    def detach(self):
+        ''' Drop all references to the current transfer.
+        '''
+        self.write = self.header = self.read = None
+
+    def install_callbacks(self):
+        self.setopt(pycurl.WRITEFUNCTION, self._on_write)
+        self.setopt(pycurl.HEADERFUNCTION, self._on_header)
+        self.setopt(pycurl.READFUNCTION, self._on_read)
+
+    def _on_write(self, chunk):
+        return self.write(chunk)
+
+    def _on_header(self, line):
+        return self.header(line)
+
+    def _on_read(self, size):
+        return self.read(size)
+
+
+class _BodyBuffer:
+    ''' Collects a response body in one buffer, without intermediate copies.
+
+        Without `into`, the buffer is a bytearray sized from Content-Length
+        (when the server sends one) and grown geometrically otherwise.
+        A bytearray `into` is used the same way, and resized to the body;
+        any other writable buffer has a fixed size, and a body that does
+        not fit is an error.
+    '''
+    __slots__ = ('content_length', 'buffer', 'size', 'growable', 'overflow')
+
+    def __init__(self, into=None):
+        self.content_length = -1 # set by the header callback
+        self.size = 0
+        self.overflow = False
+        if into is None:
+            self.buffer = None
+            self.growable = True
+        elif isinstance(into, bytearray):
+            self.buffer = into
+            self.growable = True
+        else:
+            self.buffer = memoryview(into).cast('B')
+            self.growable = False
+
+    def write(self, chunk):
+        buffer = self.buffer
+        if buffer is None:
+            # Content-Length is only a hint: it is the *encoded* length,
+            # and it might be a lie.
+            buffer = self.buffer = bytearray(max(min(self.content_length, _PREALLOCATE_MAX), 0))
+        start = self.size
+        end = self.size = start + len(chunk)
+        if end <= len(buffer):
+            buffer[start:end] = chunk
+        elif self.growable:
+            # Let bytearray's own over-allocation take care of the growth.
+            del buffer[start:]
+            buffer += chunk
+        else:
+            self.overflow = True
+            return 0
+
+    def getvalue(self):
+        ''' Return the body, as a bytearray or memoryview of the buffer.
+        '''
+        buffer = self.buffer
+        if buffer is None:
+            return bytearray()
+        if self.growable:
+            del buffer[self.size:]
+            return buffer
+        return buffer[:self.size]
+
+
+class _FileBody:
+    ''' Writes a response body to a file as it arrives, for `Session.download`.
+
+        `file` is either a binary file object, or a path. A path is
+        opened directly (no Python-level buffering); with `atomic`, a
+        temporary file next to it is written instead, and only renamed
+        over it by `commit`. With `preallocate`, the space for the body
+        is reserved from Content-Length before the first write.
+    '''
+    __slots__ = ('content_length', 'fileobj', 'fd', 'path', 'tmp', 'preallocated', 'size', 'overflow')
+
+    def __init__(self, file, *, atomic=True, preallocate=False):
+        self.content_length = -1 # set by the header callback
+        self.size = 0
+        self.overflow = False
+        self.preallocated = not preallocate or not hasattr(os, 'posix_fallocate')
+        self.fileobj = self.fd = self.path = self.tmp = None
+        if not isinstance(file, (str, bytes, os.PathLike)):
+            self.fileobj = file
+            self.preallocated = True
+        elif atomic:
+            self.path = os.fsdecode(file)
+            dirname, basename = os.path.split(self.path)
+            # Not mkstemp(): its 0600 would survive the rename, and
+            # unlike a plain open() ignore the umask.
+            while True:
+                self.tmp = os.path.join(dirname, '.%s.%s.tmp' % (basename, os.urandom(4).hex()))
+                try:
+                    self.fd = os.open(self.tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+                except FileExistsError:
+                    continue
+                break
+        else:
+            self.path = os.fsdecode(file)
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+
+    def write(self, chunk):
+        if not self.preallocated:
+            self.preallocated = True
+            if self.content_length > 0:
+                try:
+                    os.posix_fallocate(self.fd, 0, self.content_length)
+                except OSError:
+                    pass # not supported by this filesystem; it's only an optimization
+        self.size += len(chunk)
+        if self.fd is None:
+            self.fileobj.write(chunk)
+            return
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def getvalue(self):
+        return None
+
+    def commit(self, replace=True):
+        ''' Close the file after a transfer; unless `replace`, leave the target alone.
+        '''
+        if self.fd is None:
+            return
+        try:
+            if self.content_length > self.size:
+                # Undo the preallocation (the body might have been compressed).
+                os.ftruncate(self.fd, self.size)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+        if self.tmp is not None:
+            if replace:
+                os.replace(self.tmp, self.path)
+            else:
+                os.unlink(self.tmp)
+
+    def abort(self):
+        ''' Close the file after a failed transfer, and remove the temporary file.
+        '''
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        if self.tmp is not None:
+            os.unlink(self.tmp)
+
+
+class _Transfer:
+    ''' The state of one request on an easy handle, between setup and perform().
+    '''
+    __slots__ = (
+        'curl', 'method', 'hack', 'follow', 'json_loads', 'output_buffer', 'header_buffer',
+        'url', 'start', 'block_start', 'blocks',
+    )
+
+    def __init__(self, curl, method, hack, follow, read, into=None, json_loads=_json.loads, sink=None, url=None):
+        self.curl = curl
+        self.method = method
+        self.hack = hack
+        self.follow = follow
+        self.json_loads = json_loads
+        self.url = url
+        self.start = time.perf_counter()
+        # Header blocks seen so far when following redirects, as
+        # (start, end) offsets in `header_buffer` and when they ended.
+        self.block_start = 0
+        self.blocks = []
+        if sink is None:
+            sink = _BodyBuffer(into)
+        self.output_buffer = sink
+        self.header_buffer = io.BytesIO()
+        curl.write = self.output_buffer.write
+        curl.header = self._on_header
+        curl.read = read
+
+    def _on_header(self, line):
+        buf = self.header_buffer
+        if line.startswith(b'HTTP/'):
+            self.block_start = buf.tell()
+            self.output_buffer.content_length = -1
+        buf.write(line)
+        # getinfo() can't be called during perform(), so look for ourselves.
+        if line[:15].lower() == b'content-length:':
+            try:
+                self.output_buffer.content_length = int(line[15:])
+            except ValueError:
+                pass
+        elif self.follow and (line == b'\r\n' or line == b'\n'):
+            # Only note where it is; see `history` for the parsing.
+            self.blocks.append((self.block_start, buf.tell(), time.perf_counter()))
+
+    def history(self, raw_headers):
+        ''' Return the `Hop`s of the redirects followed so far.
+
+            All but the last header block are candidates; informational
+            (1xx) blocks are skipped.
+        '''
+        rv = []
+        url = self.url
+        last = self.start
+        for start, end, when in self.blocks[:-1]:
+            status_line, fields = parse_block(raw_headers[start:end])
+            try:
+                status = int(status_line.split(None, 2)[1])
+            except (IndexError, ValueError):
+                continue
+            if not 300 <= status < 400:
+                continue
+            headers = HTTPHeaders(fields)
+            location = headers.get('Location')
+            elapsed = datetime.timedelta(seconds=when - last)
+            last = when
+            rv.append(Hop(codes(status), url, location, headers, elapsed))
+            if url is not None and location is not None:
+                url = urllib.parse.urljoin(url, location)
+        return tuple(rv)
+
+    def check(self, error):
+        ''' Raise if the `pycurl.error` (if any) of perform() is a real failure.
+        '''
+        if self.output_buffer.overflow:
+            raise RequestException('Response body does not fit in the buffer') from error
+        if error is not None:
+            if self.hack and error.args[0] == pycurl.E_PARTIAL_FILE:
+                pass # ignore the expected error when using this hack
+            else:
+                raise RequestException('perform() failed') from error
+        else:
+            if self.hack:
+                raise RequestException('Expected perform() to fail when using this hack (???)')
+
+    def response(self, raw=None):
+        ''' Build the `Response` from what has been received so far.
+        '''
+        c = self.curl
+        resp = Response()
+        if raw is None:
+            resp._body = self.output_buffer.getvalue()
+        resp.raw = raw
+        resp._json_loads = self.json_loads
+        resp._raw_headers = raw_headers = self.header_buffer.getvalue()
+        if len(self.blocks) > 1:
+            resp.history = self.history(raw_headers)
+        getinfo = c.getinfo
+        status = getinfo(pycurl.RESPONSE_CODE)
+        # Skip the metaclass call for the precomputed codes.
+        resp.status_code = codes._by_value.get(status) or codes(status)
+        resp.url = getinfo(pycurl.EFFECTIVE_URL)
+        resp.http_version = _HTTP_VERSIONS.get(getinfo(pycurl.INFO_HTTP_VERSION))
+        resp.timings = timings = Timings._make(map(getinfo, _TIMING_INFOS))
+        resp.elapsed = datetime.timedelta(seconds=timings.total)
+        resp.stats = TransferStats._make(map(getinfo, _STATS_INFOS))
+        return resp
+
+    def finish(self, error):
+        ''' Build the `Response`, given the `pycurl.error` (if any) of perform().
+        '''
+        self.check(error)
+        return self.response()
+
+
 class Session:
-    __slots__ = ('curl',)
+    ''' A set of easy handles (and thus connections) to make requests with.
+
+        By default, requests reuse a single easy handle; a request that
+        comes in while it is busy (e.g. holding a streaming response, or
+        from another thread) gets a temporary one.
+
+        With `pool_size`, up to that many handles are kept, and a request
+        waits (up to `pool_timeout` seconds) for one to become free.
+        This makes it safe and efficient to share the session between
+        threads; see `pool_stats` for sizing. `map` and `gather` are not
+        thread-safe, though.
+
+        With `cache` (a `Cache`), GET responses are cached as HTTP allows;
+        this applies to `request` and the verb methods, not to `map`.
+        See `add_hook` for observing every request.
+
+        With `http2=True`, HTTP/2 is negotiated (with ALPN) over TLS;
+        with `http2='prior-knowledge'`, it is also used over cleartext
+        (h2c), without falling back to HTTP/1.1. Transfers then wait for
+        an existing connection to be able to multiplex over it, so the
+        concurrent requests of `map`, `gather` and `AsyncSession` share
+        one connection per host. `Response.http_version` tells what was used.
+
+        `json_dumps(obj)` serializes `json=` payloads, to bytes (or str);
+        `json_loads(data)` parses bytes for `Response.json`. They default
+        to the stdlib `json` module, but e.g. orjson's can be used instead.
+    '''
+    __slots__ = ('share', 'pool_size', 'pool_timeout', 'cache', 'http2', 'json_dumps', 'json_loads', '_pool', '_engine', '_template', '_vary_source', '_header_lists', '_hooks')
+
+    def __init__(self, *, share=None, pool_size=None, pool_timeout=None, cache=None, http2=False, json_dumps=_json_dumps, json_loads=_json.loads):
+        assert http2 in (False, True, 'prior-knowledge'), http2
+        self.share = share
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.cache = cache
+        self.http2 = http2
+        self.json_dumps = json_dumps
+        self.json_loads = json_loads
+        # Options that are the same for every request of this session.
+        self._template = [
+            (pycurl.ACCEPT_ENCODING, b'gzip, deflate'),
+        ]
+        if http2:
+            if http2 == 'prior-knowledge':
+                self._template.append((pycurl.HTTP_VERSION, pycurl.CURL_HTTP_VERSION_2_PRIOR_KNOWLEDGE))
+            else:
+                self._template.append((pycurl.HTTP_VERSION, pycurl.CURL_HTTP_VERSION_2TLS))
+            self._template.append((pycurl.PIPEWAIT, True))
+        # What a GET request is sent with, for the cache to match Vary.
+        self._vary_source = {
+            'accept': '*/*',
+            'accept-encoding': 'gzip, deflate',
+            'user-agent': pycurl.version,
+        }
+        if not http2:
+            self._vary_source['connection'] = 'keep-alive'
+        self._header_lists = {}
+        self._hooks = {} # event -> non-empty list of hooks
 
     def __enter__(self):
-        self.curl = pycurl.Curl()
+        if self.pool_size is None:
+            self._pool = HandlePool(self._new_curl)
+        else:
+            self._pool = HandlePool(self._new_curl, self.pool_size, block=True, timeout=self.pool_timeout)
+        self._engine = None
         return self
 
     def __exit__(self, ty, v, tb):
-        self.curl.close()
-        del self.curl
+        if self._engine is not None:
+            self._engine.close()
+        del self._engine
+        # Handles held by streaming responses are closed when they are
+        # released, so keep the (closed) pool for them.
+        self._pool.close()
 
-    def request(self, method, url, *, params=None, data=None, json=None, allow_redirects=True, stacklevel=1):
-        url = _add_params(url, params)
-        c = self.curl
-        try:
+    def _new_curl(self):
+        c = _Easy()
+        # This survives reset().
+        if self.share is not None:
+            c.setopt(pycurl.SHARE, self.share.curl_share)
+        return c
+
+    def _release(self, c):
+        c.detach()
+        self._pool.release(c)
+
+    def _apply(self, c, opts):
+        ''' Make the options of `c` match `opts` (plus the session template).
+
+            If `c` was last used with the same set of options, only the
+            values that changed are set. Otherwise it is reset() first,
+            since libcurl options can't generally be unset one by one.
+        '''
+        applied = c.applied
+        c.applied = None # in case of errors below
+        if applied is None or applied.keys() != opts.keys():
             c.reset()
-            if 0: c.setopt(pycurl.VERBOSE, True)
-            headers = []
+            c.install_callbacks()
+            for opt, value in self._template:
+                c.setopt(opt, value)
+            for opt, value in opts.items():
+                c.setopt(opt, value)
+        else:
+            for opt, value in opts.items():
+                old = applied[opt]
+                if old is not value and old != value:
+                    c.setopt(opt, value)
+        c.applied = opts
+
+    def add_hook(self, event, hook):
+        ''' Call `hook` on `event` for every request of this session.
+
+            - 'before_send': `hook(request)`, with the `Request` about to
+              be sent; it may modify its `method`, `url` and `kwargs`.
+            - 'response': `hook(request, response)`.
+            - 'error': `hook(request, exc)`, with the `RequestException`
+              about to be raised.
+
+            Without any hooks, no `Request` objects are even created.
+        '''
+        assert event in _HOOK_EVENTS, event
+        self._hooks.setdefault(event, []).append(hook)
+
+    def remove_hook(self, event, hook):
+        hooks = self._hooks[event]
+        hooks.remove(hook)
+        if not hooks:
+            del self._hooks[event]
+
+    def _emit(self, event, *args):
+        for hook in self._hooks.get(event, ()):
+            hook(*args)
+
+    def pool_stats(self):
+        ''' Return a dict of the handle pool's size, usage and contention counters.
+        '''
+        return self._pool.stats()
+
+    def _setup(self, c, method, url, *, params=None, data=None, json=None, allow_redirects=True, into=None, _sink=None, _headers=(), stacklevel=1):
+        ''' Set all the options on `c` for one request; perform() is up to the caller.
+        '''
+        url = _add_params(url, params)
+        opts = {}
+        if 0: opts[pycurl.VERBOSE] = True
+        headers = []
+        hack = False
+        read = None
+        content_type = None
+        if json is not None:
+            assert data is None, 'data= and json= are mutually exclusive'
+            data = self.json_dumps(json)
             if isinstance(data, str):
-                data = data.encode('ascii')
+                data = data.encode('utf-8')
+            content_type = 'Content-Type: application/json'
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        if not self.http2:
+            # HTTP/2 has no Connection header; its connections are persistent anyway.
             headers.append('Connection: keep-alive')
-            c.setopt(pycurl.ACCEPT_ENCODING, b'gzip, deflate')
-            method = method.casefold().upper()
-            if 0:
-                pass
-            elif method == 'GET':
-                if 0: c.setopt(pycurl.HTTPGET, True)
-                if data:
-                    warnings.warn('Payload with a GET is unspecified', RequestWarning, stacklevel=stacklevel+1)
-                    c.setopt(pycurl.UPLOAD, True)
-                    c.setopt(pycurl.CUSTOMREQUEST, method)
-            elif method == 'HEAD':
-                c.setopt(pycurl.NOBODY, True)
-                if data:
-                    warnings.warn('Payload with a HEAD is unspecified', RequestWarning, stacklevel=stacklevel+1)
-                    c.setopt(pycurl.UPLOAD, True)
-                    c.setopt(pycurl.CUSTOMREQUEST, method)
-                    headers[headers.index('Connection: keep-alive')] = 'Connection: close'
-            elif method == 'POST':
-                if data is None: data = b''
-                c.setopt(pycurl.POST, True)
-            elif method == 'PUT':
+        method = method.casefold().upper()
+        if 0:
+            pass
+        elif method == 'GET':
+            if 0: opts[pycurl.HTTPGET] = True
+            if data:
+                warnings.warn('Payload with a GET is unspecified', RequestWarning, stacklevel=stacklevel+1)
+                opts[pycurl.UPLOAD] = True
+                opts[pycurl.CUSTOMREQUEST] = method
+        elif method == 'HEAD':
+            opts[pycurl.NOBODY] = True
+            if data:
+                warnings.warn('Payload with a HEAD is unspecified', RequestWarning, stacklevel=stacklevel+1)
+                opts[pycurl.UPLOAD] = True
+                opts[pycurl.CUSTOMREQUEST] = method
+                if 'Connection: keep-alive' in headers:
+                    headers.remove('Connection: keep-alive')
+                headers.insert(0, 'Connection: close')
+                hack = True
+        elif method == 'POST':
+            if data is None: data = b''
+            opts[pycurl.POST] = True
+        elif method == 'PUT':
+            if data is None: data = b''
+            opts[pycurl.UPLOAD] = True
+        else:
+            # OPTIONS goes here too.
+            if method in {'DELETE', 'PATCH'}:
+                opts[pycurl.UPLOAD] = True
                 if data is None: data = b''
-                c.setopt(pycurl.UPLOAD, True)
+            elif data:
+                opts[pycurl.UPLOAD] = True
+            opts[pycurl.CUSTOMREQUEST] = method
+        if data is not None:
+            if method == 'POST' and isinstance(data, bytes):
+                opts[pycurl.POSTFIELDSIZE_LARGE] = len(data)
+                opts[pycurl.COPYPOSTFIELDS] = data
+                headers.append(content_type or 'Content-Type:')
             else:
-                # OPTIONS goes here too.
-                if method in {'DELETE', 'PATCH'}:
-                    c.setopt(pycurl.UPLOAD, True)
-                    if data is None: data = b''
-                elif data:
-                    c.setopt(pycurl.UPLOAD, True)
-                c.setopt(pycurl.CUSTOMREQUEST, method)
-            if data is not None:
+                read, length = upload_source(data)
                 if method == 'POST':
-                    c.setopt(pycurl.POSTFIELDSIZE_LARGE, len(data))
-                    c.setopt(pycurl.COPYPOSTFIELDS, data)
-                    headers.append('Content-Type:')
+                    opts[pycurl.POSTFIELDSIZE_LARGE] = length
+                    headers.append(content_type or 'Content-Type:')
                 else:
-                    c.setopt(pycurl.READDATA, io.BytesIO(data))
-                    c.setopt(pycurl.INFILESIZE_LARGE, len(data))
-                    headers.append('Expect:')
-            c.setopt(pycurl.FOLLOWLOCATION, allow_redirects)
-            c.setopt(pycurl.URL, url.encode('ascii'))
-            output_buffer = io.BytesIO()
-            header_buffer = io.BytesIO()
-            c.setopt(pycurl.WRITEFUNCTION, output_buffer.write)
-            c.setopt(pycurl.HEADERFUNCTION, header_buffer.write)
-            c.setopt(pycurl.HTTPHEADER, headers)
+                    opts[pycurl.INFILESIZE_LARGE] = length
+                    if content_type is not None:
+                        headers.append(content_type)
+                headers.append('Expect:')
+                if length < 0:
+                    headers.append('Transfer-Encoding: chunked')
+        opts[pycurl.FOLLOWLOCATION] = allow_redirects
+        opts[pycurl.URL] = url.encode('ascii')
+        if _headers:
+            # Not worth remembering: these differ from one URL to the next.
+            opts[pycurl.HTTPHEADER] = [h.encode('latin-1') for h in headers + list(_headers)]
+        else:
+            # Reusing the same list object lets _apply() skip it by identity.
+            headers = tuple(headers)
             try:
-                c.perform()
-            except pycurl.error as e:
-                if method == 'HEAD' and data and e.args[0] == pycurl.E_PARTIAL_FILE:
-                    pass # ignore the expected error when using this hack
+                opts[pycurl.HTTPHEADER] = self._header_lists[headers]
+            except KeyError:
+                opts[pycurl.HTTPHEADER] = self._header_lists[headers] = [h.encode('ascii') for h in headers]
+        self._apply(c, opts)
+        return _Transfer(c, method, hack, allow_redirects, read, into, self.json_loads, _sink, url)
+
+    def request(self, method, url, *, stacklevel=1, **kwargs):
+        ''' Perform a request and return its `Response`.
+
+            With `stream=True`, return as soon as the headers have arrived;
+            the body is then transferred as it is read from `Response.raw`
+            (or `iter_content`, `iter_lines`). The easy handle is kept
+            until the body is exhausted or the response is closed.
+
+            `data` can be str or bytes, or be streamed from a buffer (such
+            as a memoryview or mmap), a binary file or an iterable of chunks;
+            when its length can't be known, chunked encoding is used.
+
+            With `into`, the body is written directly into that buffer,
+            e.g. a reused bytearray; see `Response.body`.
+        '''
+        if not self._hooks:
+            return self._request(method, url, stacklevel=stacklevel+1, **kwargs)
+        req = Request(method, url, **kwargs)
+        self._emit('before_send', req)
+        try:
+            resp = self._request(req.method, req.url, stacklevel=stacklevel+1, **req.kwargs)
+        except RequestException as e:
+            self._emit('error', req, e)
+            raise
+        self._emit('response', req, resp)
+        return resp
+
+    def _request(self, method, url, *, stream=False, stacklevel=1, **kwargs):
+        lookup = None
+        if self.cache is not None and not stream:
+            lookup = self._cache_lookup(method, url, kwargs)
+            if lookup is not None:
+                if lookup.response is not None:
+                    return lookup.response
+                kwargs['_headers'] = lookup.headers
+        c = self._pool.acquire()
+        try:
+            xfer = self._setup(c, method, url, stacklevel=stacklevel+1, **kwargs)
+            if stream:
+                assert kwargs.get('into') is None, 'into= does not make sense with stream=True'
+                raw = RawStream(xfer, self._release)
+                c = None # now owned by `raw`
+                try:
+                    raw._start()
+                    return xfer.response(raw)
+                except BaseException:
+                    raw.close()
+                    raise
+            try:
+                if c.multi is None:
+                    c.perform()
                 else:
-                    raise RequestException('perform() failed') from e
+                    perform(c.multi, c)
+            except pycurl.error as e:
+                resp = xfer.finish(e)
             else:
-                if method == 'HEAD' and data:
-                    raise RequestException('Expected perform() to fail when using this hack (???)')
-            resp = Response()
-            resp.content = output_buffer.getvalue()
-            resp.headers = CaseInsensitiveDict()
-            for line in header_buffer.getvalue().decode('ascii').split('\r\n')[1:-2]:
-                k, _, v = line.partition(': ')
-                assert k not in resp.headers
-                resp.headers[k] = v
-            resp.status_code = codes(c.getinfo(pycurl.RESPONSE_CODE))
+                resp = xfer.finish(None)
         finally:
-            c.reset()
+            if c is not None:
+                self._release(c)
+        if lookup is not None:
+            resp = self.cache.store(lookup, resp)
         return resp
 
+    def _cache_lookup(self, method, url, kwargs):
+        ''' Return the cache's `_Lookup` for a request, or None to bypass the cache.
+        '''
+        method = method.casefold().upper()
+        if method == 'GET' and any(kwargs.get(k) is not None for k in ('data', 'json', 'into', '_sink')):
+            return None
+        return self.cache.lookup(method, _add_params(url, kwargs.get('params')), self._vary_source, self.json_loads)
+
+    def download(self, url, file, *, atomic=True, preallocate=False, stacklevel=1, **kwargs):
+        ''' GET `url`, writing the body straight to `file` (a path or a binary file object).
+
+            For a path, with `atomic`, the body goes to a temporary file
+            that replaces `file` only if the transfer succeeds with a
+            status below 400. With `preallocate`, disk space for the body
+            is reserved from Content-Length. The `Response` has no content.
+        '''
+        assert not kwargs.get('stream') and kwargs.get('into') is None
+        body = _FileBody(file, atomic=atomic, preallocate=preallocate)
+        try:
+            resp = self.request('get', url, _sink=body, stacklevel=stacklevel+1, **kwargs)
+        except BaseException:
+            body.abort()
+            raise
+        body.commit(resp.status_code < 400)
+        return resp
+
+    def gather(self, requests, *, max_connections=10, max_per_host=None, return_exceptions=False, stacklevel=1):
+        ''' Perform many `Request`s concurrently, yielding `(index, response)` as each completes.
+
+            At most `max_connections` transfers are in flight at once, and
+            at most `max_per_host` of those to any one `host:port`.
+            If `return_exceptions`, a failed transfer yields its
+            `RequestException` in place of the response; otherwise the
+            first failure is raised and the remaining transfers are abandoned.
+        '''
+        if self._engine is None:
+            from .multi import _Engine
+            self._engine = _Engine(self._new_curl)
+        return self._engine.run(self, requests, max_connections=max_connections, max_per_host=max_per_host, return_exceptions=return_exceptions, stacklevel=stacklevel+1)
+
+    def map(self, requests, stacklevel=1, **kwargs):
+        ''' Like `gather`, but return a list of responses in the order of `requests`.
+        '''
+        requests = list(requests)
+        rv = [None] * len(requests)
+        for i, resp in self.gather(requests, stacklevel=stacklevel+1, **kwargs):
+            rv[i] = resp
+        return rv
+
     def delete(self, url, stacklevel=1, **kwargs):
         return self.request('delete', url, stacklevel=stacklevel+1, **kwargs)
 
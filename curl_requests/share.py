@@ -0,0 +1,32 @@
+import pycurl
+
+
+class Share:
+    ''' Caches that several sessions (in any threads) can use together.
+
+        Attach it with `Session(share=...)`. Depending on the arguments,
+        the sessions share one DNS cache, one TLS session cache (so
+        handshakes can be resumed) and one connection cache.
+        pycurl serializes access to the underlying `pycurl.CurlShare`.
+    '''
+    __slots__ = ('curl_share',)
+
+    def __init__(self, *, dns=True, ssl_sessions=True, connections=True):
+        share = self.curl_share = pycurl.CurlShare()
+        if dns:
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        if ssl_sessions:
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+        if connections:
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_CONNECT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ty, v, tb):
+        self.close()
+
+    def close(self):
+        ''' Release the caches; no session may use this share afterwards.
+        '''
+        self.curl_share.close()
@@ -0,0 +1,135 @@
+import io
+
+import pycurl
+
+
+def perform(multi, c):
+    ''' Like `c.perform()`, but on `multi` (and with its connection cache).
+    '''
+    multi.add_handle(c)
+    try:
+        while True:
+            while multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                pass
+            num_q, ok_list, err_list = multi.info_read()
+            if err_list:
+                raise pycurl.error(*err_list[0][1:])
+            if ok_list:
+                return
+            multi.select(1.0)
+    finally:
+        multi.remove_handle(c)
+
+
+class RawStream(io.RawIOBase):
+    ''' The body of a `stream=True` response, transferred on demand.
+
+        The transfer runs on the handle's own `pycurl.CurlMulti` (which
+        keeps the connection for its next transfers), and is only driven
+        while a read is waiting for data. Whenever more than `limit`
+        bytes are buffered, the transfer is paused until they are consumed,
+        so memory use is bounded no matter how large the body is.
+    '''
+
+    def __init__(self, xfer, release):
+        super().__init__()
+        self.limit = io.DEFAULT_BUFFER_SIZE
+        self._xfer = xfer
+        self._release = release
+        self._multi = None
+        self._buffer = bytearray()
+        self._paused = False
+        self._finished = False
+        self._headers_done = False
+        self._events = 0
+        self._status = 0
+        self._location = False
+        c = xfer.curl
+        c.write = self._on_write
+        c.header = self._on_header
+
+    def _on_header(self, line):
+        self._xfer._on_header(line)
+        self._events += 1
+        if line.startswith(b'HTTP/'):
+            self._status = int(line.split(None, 2)[1])
+            self._location = False
+        elif line[:9].lower() == b'location:':
+            self._location = True
+        elif line == b'\r\n':
+            # Informational responses and redirects that will be followed
+            # are not the final header block.
+            if self._status < 200:
+                return
+            if self._xfer.follow and 300 <= self._status < 400 and self._location:
+                return
+            self._headers_done = True
+
+    def _on_write(self, chunk):
+        self._events += 1
+        self._headers_done = True
+        if len(self._buffer) >= self.limit:
+            self._paused = True
+            return pycurl.WRITEFUNC_PAUSE
+        self._buffer += chunk
+
+    def _start(self):
+        ''' Begin the transfer and drive it until the headers are in.
+        '''
+        c = self._xfer.curl
+        if c.multi is None:
+            c.multi = pycurl.CurlMulti()
+        self._multi = c.multi
+        self._multi.add_handle(c)
+        while not self._headers_done and not self._finished:
+            self._pump()
+
+    def _pump(self):
+        c = self._xfer.curl
+        multi = self._multi
+        events = self._events
+        if self._paused:
+            self._paused = False
+            c.pause(pycurl.PAUSE_CONT)
+        while True:
+            ret, num_handles = multi.perform()
+            if ret != pycurl.E_CALL_MULTI_PERFORM:
+                break
+        num_q, ok_list, err_list = multi.info_read()
+        if ok_list or err_list:
+            error = None
+            if err_list:
+                error = pycurl.error(*err_list[0][1:])
+            self._finish(error)
+        elif events == self._events and not self._paused:
+            multi.select(1.0)
+
+    def _finish(self, error):
+        self._finished = True
+        c = self._xfer.curl
+        self._multi.remove_handle(c)
+        try:
+            self._xfer.check(error)
+        finally:
+            self._release(c)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._finished:
+            self._pump()
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        del self._buffer[:n]
+        return n
+
+    def close(self):
+        if not self.closed and not self._finished:
+            self._finished = True
+            c = self._xfer.curl
+            if self._multi is not None:
+                self._multi.remove_handle(c)
+            self._release(c)
+        self._buffer = bytearray()
+        super().close()
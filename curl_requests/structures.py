@@ -1,18 +1,23 @@
-from collections import OrderedDict
 from collections.abc import Mapping, MutableMapping
-import unicodedata
 
 
+# unicodedata is imported on first use: header names are nearly always
+# ASCII, which `_fold` handles without it.
+
 def _nfc(s):
+    import unicodedata
     return unicodedata.normalize('NFC', s)
 
 def _nfd(s):
+    import unicodedata
     return unicodedata.normalize('NFD', s)
 
 def _nfkc(s):
+    import unicodedata
     return unicodedata.normalize('NFKC', s)
 
 def _nfkd(s):
+    import unicodedata
     return unicodedata.normalize('NFKD', s)
 
 def _canonical_fold(s):
@@ -22,33 +27,58 @@ def _identifier_fold(s):
     return _nfkd(str.casefold(_nfkd(str.casefold(_nfd(s)))))
 
 
+_fold_cache = {}
+_FOLD_CACHE_SIZE = 512
+
+def _fold(s):
+    ''' Same as `_canonical_fold`, but fast for the usual (ASCII) header names.
+    '''
+    # For ASCII, both normalizations are no-ops and casefold() is lower().
+    if s.isascii():
+        return s.lower()
+    try:
+        return _fold_cache[s]
+    except KeyError:
+        pass
+    rv = _canonical_fold(s)
+    if len(_fold_cache) >= _FOLD_CACHE_SIZE:
+        _fold_cache.clear()
+    _fold_cache[s] = rv
+    return rv
+
+
 class CaseInsensitiveDict(MutableMapping):
     ''' General-purpose case-insensitive dict.
 
         Most implementations are flawed. See the tests.
     '''
+    __slots__ = ('_dict',)
+
     def __init__(*args, **kwargs):
         self, *args = args
-        self._dict = OrderedDict()
+        self._dict = {}
         self.update(*args, **kwargs)
 
     def __repr__(self):
         return '%s%r' % (self.__class__.__name__, dict(self))
 
     def __getitem__(self, key):
-        fold_key = _canonical_fold(key)
+        fold_key = _fold(key)
         orig_key, value = self._dict[fold_key]
         return value
 
+    def __contains__(self, key):
+        return _fold(key) in self._dict
+
     def __setitem__(self, key, value):
-        fold_key = _canonical_fold(key)
+        fold_key = _fold(key)
         orig_key, orig_value = self._dict.get(fold_key, (None, None))
         if orig_key is not None:
             key = orig_key
         self._dict[fold_key] = (key, value)
 
     def __delitem__(self, key):
-        fold_key = _canonical_fold(key)
+        fold_key = _fold(key)
         del self._dict[fold_key]
 
     def __iter__(self):
@@ -69,3 +99,42 @@ class CaseInsensitiveDict(MutableMapping):
             if v2 is absent or v != v2:
                 return False
         return True
+
+
+class HTTPHeaders(CaseInsensitiveDict):
+    ''' The fields of an HTTP header block.
+
+        Looking up a repeated field returns all of its values joined with
+        ', ', as RFC 9110 allows; use `get_all` for fields such as
+        Set-Cookie, which must not be combined.
+    '''
+    __slots__ = ('_fields',)
+
+    def __init__(self, fields=()):
+        super().__init__()
+        self._fields = list(fields)
+        setitem = super().__setitem__
+        for k, v in self._fields:
+            if k in self:
+                v = self[k] + ', ' + v
+            setitem(k, v)
+
+    def __setitem__(self, key, value):
+        # Replaces every value of the field, for `get_all` too.
+        self._discard(key)
+        super().__setitem__(key, value)
+        self._fields.append((key, value))
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._discard(key)
+
+    def _discard(self, key):
+        fold_key = _fold(key)
+        self._fields = [f for f in self._fields if _fold(f[0]) != fold_key]
+
+    def get_all(self, key):
+        ''' Return a list of every value of the field `key`, in order.
+        '''
+        fold_key = _fold(key)
+        return [v for k, v in self._fields if _fold(k) == fold_key]
@@ -1,4 +1,5 @@
 from collections import OrderedDict
+import threading
 import unittest
 from urllib.parse import urljoin
 import warnings
@@ -361,3 +362,37 @@ class TestHttpBin(HttpBinMixin, unittest.TestCase):
                     'origin': '127.0.0.1',
                     'url': 'http://localhost:%d/get?a=b&c=d&e=f&a=c&g=h&g=i' % self.server_port,
                 }
+
+
+@unittest.skipIf(not use_curl_requests, 'curl_requests only')
+class TestDefaultSession(HttpBinMixin, unittest.TestCase):
+    def test_reuse(self):
+        from curl_requests import api
+        api.close_session()
+        assert requests.get(urljoin(self.url, 'get')).status_code == 200
+        session = api._default_session()
+        assert requests.post(urljoin(self.url, 'post'), data='abc').json()['data'] == 'abc'
+        assert api._default_session() is session
+
+        others = []
+        def other_thread():
+            assert requests.get(urljoin(self.url, 'get')).status_code == 200
+            others.append(api._default_session())
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert others[0] is not session
+
+        api.close_session()
+        assert api._default_session() is not session
+        api.close_session()
+
+    def test_no_reuse(self):
+        from curl_requests import api
+        api.close_session()
+        api.reuse_connections = False
+        try:
+            assert requests.get(urljoin(self.url, 'get')).status_code == 200
+            assert 'session' not in api._local.__dict__
+        finally:
+            api.reuse_connections = True
@@ -0,0 +1,60 @@
+import asyncio
+import io
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncSession(HttpBinMixin, unittest.TestCase):
+    def test_methods(self):
+        async def go():
+            async with requests.AsyncSession() as sess:
+                resp = await sess.get(urljoin(self.url, 'get'), params={'a': 'b'})
+                assert resp.status_code == 200
+                assert resp.json()['args'] == {'a': 'b'}
+                for method in ['delete', 'patch', 'post', 'put']:
+                    resp = await getattr(sess, method)(urljoin(self.url, method), data='abc')
+                    assert resp.status_code == 200
+                    assert resp.json()['data'] == 'abc'
+                resp = await sess.head(urljoin(self.url, 'get'))
+                assert resp.status_code == 200
+                assert resp.content == b''
+                resp = await sess.get(urljoin(self.url, 'status/404'))
+                assert resp.status_code == 404
+        run(go())
+
+    def test_concurrent(self):
+        async def go():
+            async with requests.AsyncSession() as sess:
+                urls = [urljoin(self.url, 'get?i=%d' % i) for i in range(20)]
+                resps = await asyncio.gather(*[sess.get(u) for u in urls])
+                assert [r.json()['args']['i'] for r in resps] == [str(i) for i in range(20)]
+                reqs = [requests.Request('get', u) for u in urls]
+                reqs.append(requests.Request('get', 'http://localhost:1/'))
+                resps = await sess.map(reqs, max_connections=3, max_per_host=2, return_exceptions=True)
+                assert [r.json()['args']['i'] for r in resps[:-1]] == [str(i) for i in range(20)]
+                assert isinstance(resps[-1], requests.RequestException)
+                with self.assertRaises(requests.RequestException):
+                    await sess.get('http://localhost:1/')
+        run(go())
+
+    def test_download(self):
+        async def go():
+            async with requests.AsyncSession() as sess:
+                f = io.BytesIO()
+                resp = await sess.download(urljoin(self.url, 'bytes/1000'), f)
+                assert resp.status_code == 200
+                assert resp.content is None
+                assert len(f.getvalue()) == 1000
+        run(go())
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+class TestCache(HttpBinMixin, unittest.TestCase):
+    def test_fresh(self):
+        cache = requests.Cache()
+        with requests.Session(cache=cache) as sess:
+            a = sess.get(urljoin(self.url, 'cache/60'))
+            b = sess.get(urljoin(self.url, 'cache/60'))
+            assert a.status_code == b.status_code == 200
+            assert a.content == b.content
+            assert b.json()['url'] == urljoin(self.url, 'cache/60')
+            assert b.headers['Cache-Control'] == 'public, max-age=60'
+            # a different URL
+            sess.get(urljoin(self.url, 'cache/60'), params={'a': 'b'})
+        assert cache.stats() == {'size': 2, 'hits': 1, 'misses': 2, 'revalidations': 0}
+
+    def test_revalidate(self):
+        cache = requests.Cache()
+        with requests.Session(cache=cache) as sess:
+            # an ETag, but no freshness
+            a = sess.get(urljoin(self.url, 'etag/x'))
+            b = sess.get(urljoin(self.url, 'etag/x'))
+            assert a.status_code == b.status_code == 200
+            assert a.content == b.content
+            assert b.headers['ETag'] == 'x'
+        assert cache.stats() == {'size': 1, 'hits': 0, 'misses': 1, 'revalidations': 1}
+
+    def test_not_stored(self):
+        cache = requests.Cache()
+        with requests.Session(cache=cache) as sess:
+            for params in [{'Cache-Control': 'no-store, max-age=60'}, {'Cache-Control': 'max-age=60', 'Vary': '*'}]:
+                for i in range(2):
+                    assert sess.get(urljoin(self.url, 'response-headers'), params=params).status_code == 200
+            # matching Vary is fine
+            for i in range(2):
+                assert sess.get(urljoin(self.url, 'response-headers'), params={'Cache-Control': 'max-age=60', 'Vary': 'Accept-Encoding'}).status_code == 200
+        assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 5, 'revalidations': 0}
+
+    def test_redirect(self):
+        cache = requests.Cache()
+        url = urljoin(self.url, 'redirect-to?url=%2Fcache%2F60&status_code=302')
+        with requests.Session(cache=cache) as sess:
+            for i in range(2):
+                assert len(sess.get(url).history) == 1
+            sess.get(urljoin(self.url, 'cache/60'))
+            b = sess.get(urljoin(self.url, 'cache/60'))
+            assert b.url == urljoin(self.url, 'cache/60')
+        assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 3, 'revalidations': 0}
+
+    def test_invalidate(self):
+        cache = requests.Cache()
+        url = urljoin(self.url, 'response-headers?Cache-Control=max-age%3D60')
+        with requests.Session(cache=cache) as sess:
+            sess.get(url)
+            sess.get(url)
+            assert sess.post(url).status_code == 200
+            sess.get(url)
+        assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 2, 'revalidations': 0}
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as d:
+            with requests.Session(cache=requests.Cache(directory=d)) as sess:
+                a = sess.get(urljoin(self.url, 'cache/60'))
+                sess.get(urljoin(self.url, 'response-headers'), params={'Cache-Control': 'private, max-age=60'})
+            assert len(os.listdir(d)) == 1
+            cache = requests.Cache(directory=d)
+            with requests.Session(cache=cache) as sess:
+                b = sess.get(urljoin(self.url, 'cache/60'))
+                sess.get(urljoin(self.url, 'response-headers'), params={'Cache-Control': 'private, max-age=60'})
+            assert a.content == b.content
+            assert cache.stats() == {'size': 2, 'hits': 1, 'misses': 1, 'revalidations': 0}
+
+    def test_lru(self):
+        cache = requests.Cache(2)
+        with requests.Session(cache=cache) as sess:
+            for i in [1, 2, 1, 3, 1, 2]:
+                sess.get(urljoin(self.url, 'cache/60'), params={'i': i})
+        assert cache.stats() == {'size': 2, 'hits': 2, 'misses': 4, 'revalidations': 0}
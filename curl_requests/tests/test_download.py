@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import urljoin
+
+try:
+    import download
+    from tqdm import tqdm
+except ImportError: # the script needs tqdm
+    download = None
+
+from .common import HttpBinMixin, RunApp
+
+
+def expected(n):
+    ''' The body of httpbin's /range/`n`.
+    '''
+    return bytes(ord('a') + i % 26 for i in range(n))
+
+
+def ignore_range(environ, start_response):
+    ''' Like a server without byte ranges, or one whose If-Range did not match.
+    '''
+    body = expected(20000) if environ['PATH_INFO'] == '/file' else b''
+    start_response('200 OK', [('Content-Length', str(len(body))), ('ETag', '"v2"')])
+    return [body]
+
+
+@unittest.skipIf(download is None, 'tqdm is not installed')
+class TestDownload(HttpBinMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.mkdtemp()
+        self.local = os.path.join(self.dir, 'file')
+        self.tmp = self.local + '.tmp'
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        super().tearDown()
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def partial(self, url, data, **meta):
+        with open(self.tmp, 'wb') as f:
+            f.write(data)
+        with open(self.tmp + download.META_SUFFIX, 'w') as f:
+            json.dump(dict(meta, url=url), f)
+
+    def fetch(self, url):
+        job = download.Job(url, self.local)
+        with tqdm(disable=True) as progress:
+            ok = download.fetch_single(job, progress)
+        return ok, job
+
+    def test_single(self):
+        url = urljoin(self.url, 'range/5000')
+        assert download.do_download(url, self.local)
+        assert self.read(self.local) == expected(5000)
+        assert not os.path.exists(self.tmp)
+        assert download.load_meta(self.local) == {'url': url, 'etag': 'range5000'}
+
+    def test_segmented(self):
+        url = urljoin(self.url, 'range/40000')
+        with mock.patch.object(download, 'MIN_SEGMENT', 10000), mock.patch.object(download, 'fetch_segments', wraps=download.fetch_segments) as fetch:
+            assert download.do_download(url, self.local, segments=8)
+        assert fetch.call_count == 1
+        assert fetch.call_args[0][3] == 4 # limited by MIN_SEGMENT
+        assert self.read(self.local) == expected(40000)
+        assert download.load_meta(self.local)['etag'] == 'range40000'
+
+    def test_resume(self):
+        url = urljoin(self.url, 'range/20000')
+        self.partial(url, expected(5000), etag='range20000')
+        ok, job = self.fetch(url)
+        assert ok
+        assert (job.offset, job.code, job.size) == (5000, 206, 15000)
+        assert self.read(self.local) == expected(20000)
+        assert not os.path.exists(self.tmp)
+        assert not os.path.exists(self.tmp + download.META_SUFFIX)
+
+    def test_resume_without_validator(self):
+        url = urljoin(self.url, 'range/20000')
+        self.partial(url, b'x' * 5000)
+        ok, job = self.fetch(url)
+        assert ok
+        assert (job.offset, job.code, job.size) == (0, 200, 20000)
+        assert self.read(self.local) == expected(20000)
+
+    def test_resume_complete(self):
+        # The server answers 416; start over.
+        url = urljoin(self.url, 'range/20000')
+        self.partial(url, expected(20000), etag='range20000')
+        ok, job = self.fetch(url)
+        assert ok
+        assert job.code == 200
+        assert self.read(self.local) == expected(20000)
+
+    def test_resume_ignored(self):
+        with RunApp(ignore_range) as app:
+            url = urljoin(app.url, 'file')
+            # Stale, and already the full size.
+            for partial in [b'x' * 5000, b'x' * 20000]:
+                self.partial(url, partial, etag='"v1"')
+                ok, job = self.fetch(url)
+                assert ok
+                assert (job.offset, job.code) == (len(partial), 200)
+                assert self.read(self.local) == expected(20000)
+                assert not os.path.exists(self.tmp)
+            # An empty 200 replaces the partial file only when asked without the Range.
+            url = urljoin(app.url, 'empty')
+            self.partial(url, b'x' * 5000, etag='"v1"')
+            ok, job = self.fetch(url)
+            assert ok
+            assert (job.offset, job.code) == (0, 200)
+            assert self.read(self.local) == b''
+
+    def test_resume_failed(self):
+        for url in ['http://localhost:1/file', urljoin(self.url, 'status/503')]:
+            self.partial(url, expected(5000), etag='range20000')
+            assert not download.do_download(url, self.local)
+            assert self.read(self.tmp) == expected(5000)
+            assert download.load_meta(self.tmp) == {'url': url, 'etag': 'range20000'}
+            assert not os.path.exists(self.local)
+
+    def test_not_modified(self):
+        url = urljoin(self.url, 'etag/abc')
+        assert download.do_download(url, self.local)
+        assert download.load_meta(self.local)['etag'] == 'abc'
+        with open(self.local, 'wb') as f:
+            f.write(b'unchanged')
+        ok, job = self.fetch(url)
+        assert ok
+        assert job.code == 304
+        assert self.read(self.local) == b'unchanged'
+
+    def test_batch(self):
+        paths = {name: os.path.join(self.dir, name) for name in ['existing', 'new', 'missing', 'etag']}
+        with open(paths['existing'], 'wb') as f:
+            f.write(b'old')
+        manifest = [
+            (urljoin(self.url, 'range/1000'), paths['existing']),
+            (urljoin(self.url, 'range/2000'), paths['new']),
+            (urljoin(self.url, 'status/404'), paths['missing']),
+            (urljoin(self.url, 'etag/abc'), paths['etag']),
+        ]
+        summary = download.do_batch(manifest, parallel=2)
+        assert (summary['downloaded'], summary['unchanged'], summary['skipped'], summary['failed']) == (2, 0, 1, 1)
+        assert summary['failures'] == [{'url': manifest[2][0], 'local': paths['missing'], 'code': 404, 'error': None}]
+        assert self.read(paths['existing']) == b'old'
+        assert self.read(paths['new']) == expected(2000)
+        assert not os.path.exists(paths['missing'])
+
+        summary = download.do_batch(manifest[3:], refresh=True)
+        assert (summary['downloaded'], summary['unchanged'], summary['skipped'], summary['failed']) == (0, 1, 0, 0)
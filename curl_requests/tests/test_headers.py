@@ -0,0 +1,103 @@
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+from curl_requests._headers import charset, last_block, parse_block
+from curl_requests.structures import HTTPHeaders
+
+from .common import HttpBinMixin
+
+
+class TestParse(unittest.TestCase):
+    def test_blocks(self):
+        raw = (
+            b'HTTP/1.1 100 Continue\r\n\r\n'
+            b'HTTP/1.1 302 FOUND\r\nLocation: /get\r\nContent-Length: 0\r\n\r\n'
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n'
+        )
+        assert parse_block(last_block(raw)) == ('HTTP/1.1 200 OK', [('Content-Length', '2')])
+        assert parse_block(raw) == ('HTTP/1.1 100 Continue', [])
+        assert last_block(b'') == b''
+        assert parse_block(b'') == ('', [])
+
+    def test_charset(self):
+        assert charset('text/html; charset=ISO-8859-1') == 'ISO-8859-1'
+        assert charset('text/html;Charset="utf-8" ; q=1') == 'utf-8'
+        assert charset('text/html') is None
+        assert charset('') is None
+
+    def test_fields(self):
+        block = (
+            b'HTTP/1.1 200 OK\r\n'
+            b'Set-Cookie: a=1\r\n'
+            b'X-Folded: one\r\n'
+            b'  two\r\n'
+            b'\ttwo and a half\r\n'
+            b'set-cookie: b=2\r\n'
+            b'X-Latin: caf\xe9\r\n'
+            b'X-Spaces :  padded \r\n'
+            b'X-Empty:\r\n'
+            b'\r\n'
+        )
+        status_line, fields = parse_block(block)
+        assert status_line == 'HTTP/1.1 200 OK'
+        assert fields == [
+            ('Set-Cookie', 'a=1'),
+            ('X-Folded', 'one two two and a half'),
+            ('set-cookie', 'b=2'),
+            ('X-Latin', 'caf\xe9'),
+            ('X-Spaces', 'padded'),
+            ('X-Empty', ''),
+        ]
+        headers = HTTPHeaders(fields)
+        assert headers['SET-COOKIE'] == 'a=1, b=2'
+        assert headers.get_all('Set-Cookie') == ['a=1', 'b=2']
+        assert headers.get_all('X-Missing') == []
+        assert list(headers) == ['Set-Cookie', 'X-Folded', 'X-Latin', 'X-Spaces', 'X-Empty']
+
+    def test_mutation(self):
+        headers = HTTPHeaders([('Set-Cookie', 'a=1'), ('set-cookie', 'b=2'), ('X-Old', 'o')])
+        headers['X-New'] = 'v'
+        assert headers.get_all('x-new') == ['v']
+        headers['SET-COOKIE'] = 'c=3'
+        assert headers.get_all('Set-Cookie') == ['c=3']
+        assert headers['set-cookie'] == 'c=3'
+        del headers['Set-Cookie']
+        assert headers.get_all('Set-Cookie') == []
+        headers.update({'x-old': 'p'})
+        assert headers.get_all('X-Old') == ['p']
+        assert list(headers) == ['X-Old', 'X-New']
+
+
+class TestResponseHeaders(HttpBinMixin, unittest.TestCase):
+    def test_redirect(self):
+        with requests.Session() as sess:
+            for stream in [False, True]:
+                resp = sess.get(urljoin(self.url, 'redirect/3'), stream=stream)
+                assert resp.status_code == 200
+                assert 'Location' not in resp.headers
+                assert resp.headers['Content-Type'] == 'application/json'
+                assert resp.json()['url'] == urljoin(self.url, 'get')
+
+    def test_history(self):
+        with requests.Session() as sess:
+            for stream in [False, True]:
+                resp = sess.get(urljoin(self.url, 'redirect/3'), stream=stream)
+                assert [hop.status_code for hop in resp.history] == [302, 302, 302]
+                assert [hop.location for hop in resp.history] == ['/relative-redirect/2', '/relative-redirect/1', '/get']
+                assert resp.history[0].url == urljoin(self.url, 'redirect/3')
+                assert resp.history[1].url == urljoin(self.url, 'relative-redirect/2')
+                assert resp.history[2].headers['Location'] == '/get'
+                assert all(hop.elapsed.total_seconds() > 0 for hop in resp.history)
+                resp.close()
+            resp = sess.get(urljoin(self.url, 'redirect/3'), allow_redirects=False)
+            assert resp.status_code == 302
+            assert resp.history == ()
+            resp = sess.get(urljoin(self.url, 'get'))
+            assert resp.history == ()
+
+    def test_repeated(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'response-headers'), params=[('X-Thing', 'a'), ('X-Thing', 'b')])
+            assert resp.headers.get_all('x-thing') == ['a', 'b']
+            assert resp.headers['X-Thing'] == 'a, b'
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import curl_requests
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(curl_requests.__file__)))
+# Generous: it takes well under a millisecond, but 20ms+ with pycurl.
+BUDGET_US = 10000
+
+
+def run(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy(self):
+        proc = run('import sys, curl_requests; curl_requests.codes.ok; curl_requests.Response; print(*sorted(sys.modules))')
+        modules = set(proc.stdout.split())
+        for name in ('pycurl', 'asyncio', 'ssl', 'unicodedata', 'curl_requests.sessions'):
+            assert name not in modules, name
+        assert 'curl_requests.status_codes' in modules
+
+    def test_budget(self):
+        proc = run('import curl_requests; curl_requests.codes.ok')
+        total = 0
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip().startswith('curl_requests') and not fields[2].startswith('  '):
+                total += int(fields[1])
+        assert 0 < total < BUDGET_US, total
+
+    def test_submodules(self):
+        # In a fresh interpreter, so that nothing has imported them yet.
+        names = ['api', 'sessions', 'models', 'status_codes', 'structures', 'exceptions', 'utils', '_headers']
+        code = 'import curl_requests; curl_requests.api.reuse_connections = False; print(*(getattr(curl_requests, n).__name__ for n in %r))' % names
+        assert run(code).stdout.split() == ['curl_requests.' + name for name in names]
+
+    def test_attributes(self):
+        assert curl_requests.get is curl_requests.api.get
+        assert curl_requests.Session is curl_requests.sessions.Session
+        assert curl_requests.utils is sys.modules['curl_requests.utils']
+        assert set(curl_requests.__all__) <= set(dir(curl_requests))
+        with self.assertRaises(AttributeError):
+            curl_requests.nope
@@ -0,0 +1,59 @@
+import unittest
+from urllib.parse import urljoin, urlsplit
+
+import pycurl
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+class TestHooks(HttpBinMixin, unittest.TestCase):
+    def test_hooks(self):
+        events = []
+        def before_send(req):
+            events.append(('before_send', req.method))
+            req.kwargs['params'] = {'hooked': '1'}
+        with requests.Session() as sess:
+            sess.add_hook('before_send', before_send)
+            sess.add_hook('response', lambda req, resp: events.append(('response', resp.status_code)))
+            sess.add_hook('error', lambda req, e: events.append(('error', req.url)))
+            assert sess.get(urljoin(self.url, 'get')).json()['args'] == {'hooked': '1'}
+            with self.assertRaises(requests.RequestException):
+                sess.get('http://localhost:1/')
+            sess.map([requests.Request('get', urljoin(self.url, 'get'))])
+            sess.remove_hook('before_send', before_send)
+            assert sess.get(urljoin(self.url, 'get')).json()['args'] == {}
+        assert events == [
+            ('before_send', 'get'), ('response', 200),
+            ('before_send', 'get'), ('error', 'http://localhost:1/'),
+            ('before_send', 'get'), ('response', 200),
+            ('response', 200),
+        ]
+
+
+class TestMetrics(HttpBinMixin, unittest.TestCase):
+    def test_metrics(self):
+        metrics = requests.Metrics(buckets=[0.5, 10.0])
+        with requests.Session() as sess:
+            metrics.attach(sess)
+            for i in range(3):
+                sess.get(urljoin(self.url, 'get'))
+            sess.post(urljoin(self.url, 'post'), data='abc')
+            with self.assertRaises(requests.RequestException):
+                sess.get('http://localhost:1/')
+            metrics.detach(sess)
+            sess.get(urljoin(self.url, 'get'))
+        snap = metrics.snapshot()
+        host = urlsplit(self.url).netloc
+        assert set(snap['latency']) == {host}
+        get = snap['latency'][host]['GET']
+        assert get['count'] == 3
+        assert list(get['buckets']) == ['0.5', '10.0', '+Inf']
+        assert get['buckets']['+Inf'] == 3
+        assert get['sum'] > 0
+        assert snap['latency'][host]['POST']['count'] == 1
+        assert snap['statuses'] == {200: 4}
+        assert snap['errors'] == {pycurl.E_COULDNT_CONNECT: 1}
+        assert snap['responses'] == 4
+        assert 0 <= snap['connection_reuse_ratio'] <= 1
@@ -0,0 +1,44 @@
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+class TestMulti(HttpBinMixin, unittest.TestCase):
+    def test_map(self):
+        with requests.Session() as sess:
+            reqs = [requests.Request('get', urljoin(self.url, 'get'), params={'i': i}) for i in range(20)]
+            reqs.append(requests.Request('post', urljoin(self.url, 'post'), data='abc'))
+            for kwargs in [{}, {'max_connections': 1}, {'max_connections': 4, 'max_per_host': 2}]:
+                resps = sess.map(reqs, **kwargs)
+                assert len(resps) == 21
+                for i, resp in enumerate(resps[:-1]):
+                    assert resp.status_code == 200
+                    assert resp.json()['args'] == {'i': str(i)}
+                assert resps[-1].json()['data'] == 'abc'
+
+    def test_gather(self):
+        with requests.Session() as sess:
+            reqs = [requests.Request('get', urljoin(self.url, 'status/%d' % (200 + i))) for i in range(10)]
+            seen = set()
+            for i, resp in sess.gather(reqs):
+                assert i not in seen
+                seen.add(i)
+                assert resp.status_code == 200 + i
+            assert seen == set(range(10))
+
+    def test_errors(self):
+        with requests.Session() as sess:
+            reqs = [
+                requests.Request('get', urljoin(self.url, 'get')),
+                requests.Request('get', 'http://localhost:1/'),
+            ]
+            resps = sess.map(reqs, return_exceptions=True)
+            assert resps[0].status_code == 200
+            assert isinstance(resps[1], requests.RequestException)
+            with self.assertRaises(requests.RequestException):
+                sess.map(reqs)
+            # the session is still usable afterwards
+            assert sess.map(reqs[:1])[0].status_code == 200
@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+from urllib.parse import urljoin
+
+import pycurl
+
+import curl_requests as requests
+from curl_requests.pool import HandlePool
+
+from .common import HttpBinMixin
+
+
+class TestHandlePool(unittest.TestCase):
+    def test_overflow(self):
+        pool = HandlePool(pycurl.Curl)
+        a = pool.acquire()
+        b = pool.acquire()
+        assert a is not b
+        pool.release(b)
+        pool.release(a)
+        assert pool.acquire() is a
+        stats = pool.stats()
+        assert stats['size'] == 1
+        assert stats['in_use'] == 1
+        assert stats['checkouts'] == 3
+        assert stats['contended'] == stats['overflows'] == 1
+        pool.close()
+
+    def test_block(self):
+        pool = HandlePool(pycurl.Curl, 2, block=True, timeout=0.01)
+        a = pool.acquire()
+        b = pool.acquire()
+        with self.assertRaises(requests.RequestException):
+            pool.acquire()
+        threading.Timer(0.01, pool.release, (b,)).start()
+        pool.timeout = None
+        assert pool.acquire() is b
+        stats = pool.stats()
+        assert stats['size'] == 2
+        assert stats['contended'] == 2
+        assert stats['overflows'] == 0
+        assert stats['wait_time'] >= stats['max_wait_time'] > 0
+        pool.close()
+        pool.release(a)
+        pool.release(b)
+        assert pool.stats()['size'] == 0
+
+
+class TestPooledSession(HttpBinMixin, unittest.TestCase):
+    def test_threads(self):
+        with requests.Session(pool_size=3) as sess:
+            def get(i):
+                return sess.get(urljoin(self.url, 'get'), params={'i': i}).json()['args']['i']
+            with ThreadPoolExecutor(8) as executor:
+                assert list(executor.map(get, range(40))) == [str(i) for i in range(40)]
+            stats = sess.pool_stats()
+            assert 1 <= stats['size'] <= 3
+            assert stats['in_use'] == 0
+            assert stats['checkouts'] == 40
+            assert stats['overflows'] == 0
@@ -0,0 +1,260 @@
+import io
+import json
+import mmap
+import os
+import tempfile
+import unittest
+from unittest import mock
+from urllib.parse import urljoin
+
+import pycurl
+
+import curl_requests as requests
+from curl_requests import sessions
+from curl_requests._upload import upload_source
+
+from .common import HttpBinMixin
+
+
+class TestOptionDiffing(HttpBinMixin, unittest.TestCase):
+    def test_only_changes_are_set(self):
+        calls = []
+        orig_setopt = pycurl.Curl.setopt
+        def setopt(c, opt, value):
+            calls.append(opt)
+            return orig_setopt(c, opt, value)
+        with requests.Session() as sess, mock.patch.object(sessions._Easy, 'setopt', setopt, create=True):
+            assert sess.get(urljoin(self.url, 'get')).status_code == 200
+            assert pycurl.ACCEPT_ENCODING in calls
+            del calls[:]
+            assert sess.get(urljoin(self.url, 'get'), params={'a': 'b'}).json()['args'] == {'a': 'b'}
+            assert calls == [pycurl.URL]
+            del calls[:]
+            assert sess.post(urljoin(self.url, 'post'), data='abc').json()['data'] == 'abc'
+            assert pycurl.ACCEPT_ENCODING in calls
+            del calls[:]
+            assert sess.post(urljoin(self.url, 'post'), data='abcd').json()['data'] == 'abcd'
+            assert calls == [pycurl.POSTFIELDSIZE_LARGE, pycurl.COPYPOSTFIELDS]
+            del calls[:]
+            assert sess.get(urljoin(self.url, 'get')).json()['args'] == {}
+            assert sess.head(urljoin(self.url, 'get')).content == b''
+
+    def test_failed_setup(self):
+        orig_setopt = pycurl.Curl.setopt
+        def setopt(c, opt, value):
+            if opt == pycurl.URL:
+                raise pycurl.error('injected')
+            return orig_setopt(c, opt, value)
+        with requests.Session() as sess:
+            assert sess.get(urljoin(self.url, 'get')).status_code == 200
+            with mock.patch.object(sessions._Easy, 'setopt', setopt, create=True):
+                with self.assertRaises(pycurl.error):
+                    sess.put(urljoin(self.url, 'put'), data='abc')
+            assert sess.put(urljoin(self.url, 'put'), data='abc').json()['data'] == 'abc'
+            assert sess.get(urljoin(self.url, 'get')).status_code == 200
+
+
+class TestBody(HttpBinMixin, unittest.TestCase):
+    def test_body(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'bytes/1000'), params={'seed': 1})
+            assert isinstance(resp.body, memoryview)
+            assert len(resp.body) == 1000
+            assert resp.content == resp.body.tobytes()
+            assert type(resp.content) is bytes
+            # no Content-Length
+            resp = sess.get(urljoin(self.url, 'stream-bytes/100000'), params={'chunk_size': 1000})
+            assert len(resp.body) == 100000
+
+    def test_into_bytearray(self):
+        buf = bytearray(10)
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'bytes/1000'), into=buf)
+            assert len(buf) == 1000
+            assert resp.body.obj is buf
+            resp = sess.get(urljoin(self.url, 'bytes/10'), into=buf)
+            assert len(buf) == 10
+            assert resp.content == bytes(buf)
+
+    def test_into_fixed(self):
+        buf = memoryview(bytearray(100))
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'bytes/50'), into=buf)
+            assert len(resp.body) == 50
+            assert resp.content == buf[:50].tobytes()
+            with self.assertRaises(requests.RequestException):
+                sess.get(urljoin(self.url, 'bytes/1000'), into=buf)
+            assert sess.get(urljoin(self.url, 'get')).status_code == 200
+
+
+class TestUpload(HttpBinMixin, unittest.TestCase):
+    def test_buffers(self):
+        with requests.Session() as sess:
+            for data in [bytearray(b'abc'), memoryview(b'xabcx')[1:4]]:
+                assert sess.put(urljoin(self.url, 'put'), data=data).json()['data'] == 'abc'
+                assert sess.post(urljoin(self.url, 'post'), data=data).json()['data'] == 'abc'
+            with tempfile.TemporaryFile() as f:
+                f.write(b'abc' * 10000)
+                f.flush()
+                with mmap.mmap(f.fileno(), 0) as m:
+                    assert sess.put(urljoin(self.url, 'put'), data=m).json()['data'] == 'abc' * 10000
+
+    def test_file(self):
+        with requests.Session() as sess, tempfile.TemporaryFile() as f:
+            f.write(b'xyzabc' * 10000)
+            f.seek(3)
+            body = sess.put(urljoin(self.url, 'put'), data=f).json()
+            assert body['data'] == ('abcxyz' * 10000)[:-3]
+            assert body['headers']['Content-Length'] == str(60000 - 3)
+            f.seek(0)
+            body = sess.post(urljoin(self.url, 'post'), data=f).json()
+            assert body['data'] == 'xyzabc' * 10000
+            body = sess.put(urljoin(self.url, 'put'), data=io.BytesIO(b'abc')).json()
+            assert body['headers']['Content-Length'] == '3'
+
+    def test_chunks(self):
+        def chunks():
+            yield b'a'
+            yield b''
+            yield 'b'
+            yield b'c' * 100
+        read, length = upload_source(chunks())
+        assert length == -1
+        assert [read(40) for i in range(5)] == [b'a', b'b', b'c' * 40, b'c' * 40, b'c' * 20]
+        assert read(40) == b''
+        with requests.Session() as sess:
+            resp = sess.put(urljoin(self.url, 'put'), data=chunks())
+            if resp.status_code == 501:
+                self.skipTest('server does not support chunked requests')
+            body = resp.json()
+            assert body['data'] == 'ab' + 'c' * 100
+            assert body['headers']['Transfer-Encoding'] == 'chunked'
+
+    def test_rejected(self):
+        for data in [{'key': 'value', 'k2': 'v2'}, 'text', 5, object()]:
+            with self.assertRaises(TypeError):
+                upload_source(data)
+        with requests.Session() as sess:
+            with self.assertRaises(TypeError):
+                sess.put(urljoin(self.url, 'put'), data={'key': 'value'})
+            # The handle went back to the pool in a usable state.
+            assert sess.put(urljoin(self.url, 'put'), data=b'ok').json()['data'] == 'ok'
+
+
+class TestJSON(HttpBinMixin, unittest.TestCase):
+    def test_json(self):
+        with requests.Session() as sess:
+            for method in ['post', 'put', 'patch']:
+                resp = sess.request(method, urljoin(self.url, method), json={'a': ['b', 1, 'é']})
+                body = resp.json()
+                assert body['json'] == {'a': ['b', 1, 'é']}
+                assert body['headers']['Content-Type'] == 'application/json'
+                assert resp.json() is body
+            assert sess.post(urljoin(self.url, 'post'), data='abc').json()['headers'].get('Content-Type') is None
+
+    def test_codec(self):
+        dumped = []
+        loaded = []
+        def dumps(obj):
+            dumped.append(obj)
+            return json.dumps(obj, separators=(',', ':'))
+        def loads(data):
+            loaded.append(type(data))
+            return json.loads(data)
+        with requests.Session(json_dumps=dumps, json_loads=loads) as sess:
+            body = sess.post(urljoin(self.url, 'post'), json=[1, 2]).json()
+            assert body['data'] == '[1,2]'
+            assert dumped == [[1, 2]]
+            assert loaded == [bytearray]
+
+
+class TestText(HttpBinMixin, unittest.TestCase):
+    def test_text(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'encoding/utf8'))
+            assert resp.encoding == 'utf-8'
+            text = resp.text
+            assert '∮ E⋅da = Q' in text
+            assert resp.text is text
+            resp.encoding = 'latin-1'
+            assert resp.text == resp.content.decode('latin-1')
+            resp = sess.get(urljoin(self.url, 'response-headers'), params={'Content-Type': 'text/plain; charset=latin-1'})
+            assert resp.encoding == 'latin-1'
+            resp = sess.get(urljoin(self.url, 'response-headers'), params={'Content-Type': 'text/plain; charset=bogus'})
+            assert resp.text == resp.content.decode('utf-8')
+
+
+class TestDownload(HttpBinMixin, unittest.TestCase):
+    def test_path(self):
+        with requests.Session() as sess, tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'out')
+            expected = sess.get(urljoin(self.url, 'bytes/100000'), params={'seed': 1}).content
+            for preallocate in [False, True]:
+                resp = sess.download(urljoin(self.url, 'bytes/100000'), path, params={'seed': 1}, preallocate=preallocate)
+                assert resp.status_code == 200
+                assert resp.content is None
+                with open(path, 'rb') as f:
+                    assert f.read() == expected
+            # compressed, so Content-Length is less than the body
+            resp = sess.download(urljoin(self.url, 'gzip'), path, preallocate=True)
+            with open(path, 'rb') as f:
+                assert json.load(f)['gzipped'] is True
+            resp = sess.download(urljoin(self.url, 'status/404'), path)
+            assert resp.status_code == 404
+            with open(path, 'rb') as f:
+                assert json.load(f)['gzipped'] is True
+            assert os.listdir(d) == ['out']
+            resp = sess.download(urljoin(self.url, 'bytes/10'), path, atomic=False)
+            assert os.path.getsize(path) == 10
+            with self.assertRaises(requests.RequestException):
+                sess.download('http://localhost:1/', path)
+            assert os.listdir(d) == ['out']
+
+    @unittest.skipIf(os.name != 'posix', 'no umask')
+    def test_mode(self):
+        umask = os.umask(0o027)
+        try:
+            with requests.Session() as sess, tempfile.TemporaryDirectory() as d:
+                for atomic in [True, False]:
+                    path = os.path.join(d, 'out-%s' % atomic)
+                    sess.download(urljoin(self.url, 'bytes/10'), path, atomic=atomic)
+                    assert os.stat(path).st_mode & 0o777 == 0o640
+        finally:
+            os.umask(umask)
+
+    def test_fileobj(self):
+        with requests.Session() as sess:
+            f = io.BytesIO()
+            resp = sess.download(urljoin(self.url, 'bytes/1000'), f, params={'seed': 2})
+            assert resp.status_code == 200
+            assert f.getvalue() == sess.get(urljoin(self.url, 'bytes/1000'), params={'seed': 2}).content
+
+
+class TestStats(HttpBinMixin, unittest.TestCase):
+    def test_stats(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'redirect-to'), params={'url': '/bytes/1000'})
+            assert resp.url == urljoin(self.url, 'bytes/1000')
+            t = resp.timings
+            assert 0 <= t.namelookup <= t.connect <= t.pretransfer <= t.starttransfer <= t.total
+            assert t.redirect <= t.total
+            assert resp.elapsed.total_seconds() == t.total
+            assert resp.stats.downloaded == 1000
+            assert resp.stats.uploaded == 0
+            assert resp.stats.download_speed > 0
+            resp = sess.put(urljoin(self.url, 'put'), data='abc')
+            assert resp.stats.uploaded == 3
+            assert resp.stats.num_connects in (0, 1)
+
+
+class TestHTTP2(HttpBinMixin, unittest.TestCase):
+    def test_fallback(self):
+        # Over cleartext, without prior knowledge, HTTP/1.x it is.
+        with requests.Session(http2=True) as sess:
+            resp = sess.get(urljoin(self.url, 'get'))
+            assert resp.status_code == 200
+            assert resp.http_version in ('HTTP/1.0', 'HTTP/1.1')
+            resps = sess.map([requests.Request('get', urljoin(self.url, 'get'), params={'i': i}) for i in range(4)])
+            assert [r.json()['args']['i'] for r in resps] == ['0', '1', '2', '3']
+        with requests.Session() as sess:
+            assert sess.get(urljoin(self.url, 'get')).http_version in ('HTTP/1.0', 'HTTP/1.1')
@@ -0,0 +1,33 @@
+import threading
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+class TestShare(HttpBinMixin, unittest.TestCase):
+    def test_sessions(self):
+        with requests.Share() as share:
+            with requests.Session(share=share) as a, requests.Session(share=share) as b:
+                for sess in [a, b, a, b]:
+                    assert sess.get(urljoin(self.url, 'get')).status_code == 200
+                assert a.map([requests.Request('get', urljoin(self.url, 'get'))] * 3)[2].status_code == 200
+
+    def test_threads(self):
+        errors = []
+        def worker(share):
+            try:
+                with requests.Session(share=share) as sess:
+                    for i in range(5):
+                        assert sess.get(urljoin(self.url, 'get'), params={'i': i}).json()['args'] == {'i': str(i)}
+            except BaseException as e:
+                errors.append(e)
+        with requests.Share(connections=False) as share:
+            threads = [threading.Thread(target=worker, args=(share,)) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert not errors, errors
@@ -0,0 +1,38 @@
+import pickle
+import unittest
+
+from curl_requests import codes
+
+
+class TestCodes(unittest.TestCase):
+    def test_int(self):
+        ok = codes(200)
+        assert isinstance(ok, int)
+        assert ok == 200 and ok < 400
+        assert hash(ok) == hash(200)
+        assert {ok: 'a'}[200] == 'a'
+        assert 200 in {ok}
+        assert str(ok) == '%d' % ok == '%s' % ok == '200'
+        assert repr(ok) == '<curl_requests.status_codes.codes 200 OK>'
+
+    def test_interned(self):
+        assert codes(200) is codes(200) is codes.ok is codes.OK
+        assert codes.not_found == 404
+        assert codes.im_a_teapot == 418
+        assert pickle.loads(pickle.dumps(codes(404))) is codes.not_found
+        assert codes(404, 'Not Found') is codes.not_found
+
+    def test_names(self):
+        # Withdrawn codes keep their names but don't show them.
+        assert repr(codes(306)) == '<curl_requests.status_codes.codes 306>'
+        assert codes.switch_proxy is codes(306)
+
+    def test_unknown(self):
+        assert 1234 not in codes
+        weird = codes(1234)
+        assert weird is codes(1234)
+        assert 1234 in codes
+        assert weird == 1234
+        assert repr(weird) == '<curl_requests.status_codes.codes 1234>'
+        with self.assertRaises(AssertionError):
+            codes('200')
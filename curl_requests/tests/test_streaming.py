@@ -0,0 +1,105 @@
+import http.server
+import json
+import threading
+import unittest
+from urllib.parse import urljoin
+
+import curl_requests as requests
+
+from .common import HttpBinMixin
+
+
+class _Hello(http.server.BaseHTTPRequestHandler):
+    # The werkzeug server closes every connection.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        self.wfile.write(b'hello')
+
+
+class TestStreaming(HttpBinMixin, unittest.TestCase):
+    def test_iter_content(self):
+        with requests.Session() as sess:
+            url = urljoin(self.url, 'stream-bytes/100000?seed=1&chunk_size=1000')
+            expected = sess.get(url).content
+            assert len(expected) == 100000
+            resp = sess.get(url, stream=True)
+            assert resp.status_code == 200
+            chunks = list(resp.iter_content(4096))
+            assert all(len(c) <= 4096 for c in chunks)
+            assert b''.join(chunks) == expected
+            # The handle is free again.
+            assert sess.pool_stats()['in_use'] == 0
+
+    def test_iter_lines(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'stream/20'), stream=True)
+            lines = list(resp.iter_lines(chunk_size=7))
+            assert [json.loads(line.decode('utf-8'))['id'] for line in lines] == list(range(20))
+
+    def test_raw_and_close(self):
+        with requests.Session() as sess:
+            resp = sess.get(urljoin(self.url, 'bytes/50000?seed=2'), stream=True)
+            head = resp.raw.read(10)
+            assert len(head) <= 10
+            # Another request while the stream is open uses a temporary handle.
+            other = sess.get(urljoin(self.url, 'get'))
+            assert other.status_code == 200
+            resp.close()
+            assert resp.raw.closed
+            assert sess.pool_stats()['in_use'] == 0
+            resp = sess.get(urljoin(self.url, 'bytes/50000?seed=2'), stream=True)
+            assert resp.content[:len(head)] == head
+            assert len(resp.content) == 50000
+
+    def test_connection_reuse(self):
+        server = http.server.ThreadingHTTPServer(('localhost', 0), _Hello)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://localhost:%d/' % server.server_port
+        connects = []
+        try:
+            with requests.Session() as sess:
+                for i in range(3):
+                    resp = sess.get(url, stream=True)
+                    assert resp.content == b'hello'
+                    connects.append(resp.stats.num_connects)
+                # Plain requests go through the same connection cache.
+                connects.append(sess.get(url).stats.num_connects)
+                resp = sess.get(url, stream=True)
+                resp.close()
+                connects.append(sess.get(url).stats.num_connects)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert connects == [1, 0, 0, 0, 0]
+
+    def test_module_level(self):
+        resp = requests.get(urljoin(self.url, 'stream/3'), stream=True)
+        assert len(list(resp.iter_lines())) == 3
+
+    def test_outlives_session(self):
+        url = urljoin(self.url, 'bytes/50000?seed=3')
+        with requests.Session() as sess:
+            expected = sess.get(url).content
+            resp = sess.get(url, stream=True)
+            closed = sess.get(url, stream=True)
+        assert resp.content == expected
+        closed.close()
+
+    def test_module_level_no_reuse(self):
+        from curl_requests import api
+        api.close_session()
+        api.reuse_connections = False
+        try:
+            resp = requests.get(urljoin(self.url, 'stream/3'), stream=True)
+            assert len(list(resp.iter_lines())) == 3
+        finally:
+            api.reuse_connections = True
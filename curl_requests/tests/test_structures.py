@@ -4,6 +4,7 @@ import unicodedata
 import unittest
 
 from curl_requests.structures import CaseInsensitiveDict
+from curl_requests.structures import _FOLD_CACHE_SIZE, _canonical_fold, _fold, _fold_cache
 
 
 def xfail_if(cond):
@@ -130,3 +131,13 @@ class TestCaseInsensitiveDict(unittest.TestCase):
         assert CaseInsensitiveDict(a=1) == OrderedDict({'A': 1})
         # This can only work because OrderedDict.__eq__ returns NotImplemented
         assert OrderedDict({'a': 1}) == CaseInsensitiveDict(A=1)
+
+    def test_fold_fast_path(self):
+        for key in ['Content-Type', 'x-ASCII-123', 'ß', 'Ꭰ', 'à', 'ΉΙ']:
+            assert _fold(key) == _canonical_fold(key)
+            assert _fold(key) == _canonical_fold(key)
+        assert len(_fold_cache) <= _FOLD_CACHE_SIZE
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            CaseInsensitiveDict().bogus = 'attributes not allowed'
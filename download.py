@@ -1,10 +1,24 @@
+import collections
+import json
 import os
+import sys
+import time
+import urllib.parse
+
 import pycurl
 from tqdm import tqdm
 
+from curl_requests.multi import RETRY, drive
+
 
 downloader = pycurl.Curl()
 
+# Don't bother splitting into ranges smaller than this.
+MIN_SEGMENT = 1 << 20
+
+# ETag and Last-Modified of `path` are kept in `path + META_SUFFIX`.
+META_SUFFIX = '.meta.json'
+
 
 def sanitize(c):
     c.setopt(pycurl.UNRESTRICTED_AUTH, False)
@@ -18,46 +32,487 @@ def sanitize(c):
     c.setopt(pycurl.FOLLOWLOCATION, True)
 
 
-def do_download(url, local, *, safe=True):
+def load_meta(path):
+    try:
+        with open(path + META_SUFFIX) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_meta(path, url, head):
+    meta = {'url': url}
+    for name in ('etag', 'last-modified'):
+        if name in head.fields:
+            meta[name] = head.fields[name]
+    with open(path + META_SUFFIX, 'w') as f:
+        json.dump(meta, f)
+
+
+def remove(path):
+    for p in (path, path + META_SUFFIX):
+        try:
+            os.unlink(p)
+        except FileNotFoundError:
+            pass
+
+
+def conditional_headers(url, local):
+    ''' Return the headers that make the server answer 304 if `local` is current.
+    '''
+    if not os.path.exists(local):
+        return []
+    meta = load_meta(local)
+    if meta.get('url') != url:
+        return []
+    headers = []
+    if 'etag' in meta:
+        headers.append(b'If-None-Match: ' + meta['etag'].encode('latin-1'))
+    if 'last-modified' in meta:
+        headers.append(b'If-Modified-Since: ' + meta['last-modified'].encode('latin-1'))
+    return headers
+
+
+def if_range(meta):
+    etag = meta.get('etag')
+    if etag is not None and not etag.startswith('W/'):
+        return etag.encode('latin-1')
+    if 'last-modified' in meta:
+        return meta['last-modified'].encode('latin-1')
+    return None
+
+
+def do_download(url, local, *, safe=True, segments=1):
+    ''' Download `url` to the file `local`.
+
+        With `segments` > 1, and if the server supports byte ranges,
+        the file is fetched as that many ranges concurrently.
+
+        With `safe`, an interrupted download leaves its `.tmp` file
+        behind, and the next call resumes it. The ETag and Last-Modified
+        of each file are kept next to it, so that a file that has not
+        changed on the server is not downloaded again.
+    '''
     rv = False
+    job = Job(url, local, safe=safe)
     with tqdm(desc=url, total=1, unit='b', unit_scale=True) as progress:
-        xfer = XferInfoDl(url, progress)
-        if safe:
-            local_tmp = local + '.tmp'
-        else:
-            local_tmp = local
+        ok = False
+        if segments > 1 and not os.path.exists(job.tmp):
+            head, real_url, size = probe(url, job.conditions)
+            if head.status == 304:
+                return True
+            if size is not None:
+                segments = min(segments, size // MIN_SEGMENT)
+            if size is not None and segments > 1:
+                ok = fetch_segments(real_url, job.tmp, size, segments, progress)
+                if ok:
+                    save_meta(job.tmp, url, head)
+                    job.commit()
+                else:
+                    # e.g. the server ignored the Range after all
+                    progress.reset(total=1)
+        if not ok:
+            ok = fetch_single(job, progress)
+        rv = ok
+        progress.total = progress.n = progress.n - 1
+        progress.update(1)
+    return rv
+
 
-        c = downloader
+def fetch_single(job, progress):
+    c = downloader
+    while True:
         c.reset()
         sanitize(c)
+        job.setup(c)
 
         c.setopt(pycurl.NOPROGRESS, False)
-        c.setopt(pycurl.XFERINFOFUNCTION, xfer)
+        c.setopt(pycurl.XFERINFOFUNCTION, XferInfoDl(job.url, progress, job.offset))
 
-        c.setopt(pycurl.URL, url.encode('utf-8'))
-        with open(local_tmp, 'wb') as out:
-            c.setopt(pycurl.WRITEDATA, out)
+        try:
+            c.perform()
+        except pycurl.error as e:
+            error = e
+        else:
+            error = None
+        if not job.done(c, error):
+            return job.ok
+
+
+def do_batch(manifest, *, parallel=8, per_host=None, safe=True, refresh=False):
+    ''' Download all the `(url, local)` pairs of `manifest` concurrently.
+
+        At most `parallel` transfers run at once, and at most `per_host`
+        of those to any one host; they share connections.
+        Files that already exist are skipped, unless `refresh`, in which
+        case they are downloaded again only if they changed on the server.
+        Return a summary of the results, failures and throughput.
+    '''
+    jobs = []
+    skipped = 0
+    for url, local in manifest:
+        if not refresh and os.path.exists(local):
+            skipped += 1
+            continue
+        jobs.append(Job(url, local, safe=safe))
+
+    summary = {'downloaded': 0, 'unchanged': 0, 'skipped': skipped, 'failed': 0, 'bytes': 0}
+    failures = []
+    start = time.monotonic()
+    driver = Driver(parallel=parallel, per_host=per_host)
+    results = driver.run(jobs)
+    try:
+        with tqdm(total=len(jobs), unit='file') as progress:
+            for job in results:
+                summary['bytes'] += job.size
+                if job.code == 304:
+                    summary['unchanged'] += 1
+                elif job.ok:
+                    summary['downloaded'] += 1
+                else:
+                    summary['failed'] += 1
+                    failures.append({'url': job.url, 'local': job.local, 'code': job.code, 'error': job.error and str(job.error)})
+                progress.set_postfix_str(tqdm.format_sizeof(summary['bytes'], 'B'), refresh=False)
+                progress.update(1)
+    finally:
+        results.close()
+        driver.close()
+    summary['seconds'] = elapsed = time.monotonic() - start
+    summary['bytes_per_second'] = summary['bytes'] / elapsed if elapsed else 0.0
+    summary['failures'] = failures
+    return summary
+
+
+def read_manifest(path):
+    ''' Yield `(url, local)` from a JSONL file of `[url, local]` or `{"url": ..., "local": ...}`.
+    '''
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                yield entry['url'], entry['local']
+            else:
+                url, local = entry
+                yield url, local
+
+
+def probe(url, conditions=()):
+    ''' Ask the server (with HEAD) whether `url` can be fetched in ranges.
+
+        Return the final `Head`, the URL after redirects, and the size
+        of the file, or None if the server does not advertise byte ranges.
+    '''
+    head = Head()
+
+    c = downloader
+    c.reset()
+    sanitize(c)
+    # Ranges apply to the encoded body, so don't let it be encoded.
+    c.setopt(pycurl.ACCEPT_ENCODING, b'identity')
+    c.setopt(pycurl.NOBODY, True)
+    c.setopt(pycurl.HEADERFUNCTION, head)
+    c.setopt(pycurl.HTTPHEADER, list(conditions))
+
+    c.setopt(pycurl.URL, url.encode('utf-8'))
+    try:
+        c.perform()
+    except pycurl.error:
+        return head, url, None
+    if c.getinfo(pycurl.RESPONSE_CODE) >= 400:
+        return head, url, None
+    url = c.getinfo(pycurl.EFFECTIVE_URL)
+    size = c.getinfo(pycurl.CONTENT_LENGTH_DOWNLOAD_T)
+    if head.fields.get('accept-ranges', '').lower() != 'bytes' or size < 0:
+        return head, url, None
+    return head, url, size
+
+
+def fetch_segments(url, local_tmp, size, segments, progress):
+    ''' Fetch the `size` bytes of `url` as `segments` concurrent ranges.
+
+        Each range is written at its own offset of `local_tmp`.
+        On failure, `local_tmp` is removed and False returned.
+    '''
+    progress.total = size
+    step = -(-size // segments)
+    ok = True
+    fd = os.open(local_tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    driver = Driver(parallel=segments)
+    try:
+        os.ftruncate(fd, size)
+        parts = [Segment(url, fd, start, min(start + step, size), progress) for start in range(0, size, step)]
+        results = driver.run(parts)
+        try:
+            for part in results:
+                if not part.ok:
+                    ok = False
+                    break
+        finally:
+            results.close()
+    finally:
+        driver.close()
+        os.close(fd)
+    if not ok:
+        os.unlink(local_tmp)
+    return ok
+
+
+class Driver:
+    ''' Run jobs concurrently on one `pycurl.CurlMulti`.
+
+        Easy handles are reused from one job to the next, and all of them
+        share the connection cache of the multi handle.
+        A job has a `url`, a `setup(c)` method that sets its options on a
+        (sanitized) easy handle, and a `done(c, error)` method that
+        returns True if the job needs to be run again.
+    '''
+    def __init__(self, *, parallel=8, per_host=None):
+        assert parallel >= 1
+        assert per_host is None or per_host >= 1
+        self.multi = pycurl.CurlMulti()
+        self.parallel = parallel
+        self.per_host = per_host
+        self.idle = []
+
+    def close(self):
+        for c in self.idle:
+            c.close()
+        self.idle = []
+        self.multi.close()
+
+    def run(self, jobs):
+        ''' Yield each of `jobs` once it is done.
+
+            The scheduling is that of `Session.gather`.
+        '''
+        waiting = collections.OrderedDict()
+        for job in jobs:
+            waiting.setdefault(urllib.parse.urlsplit(job.url).netloc, collections.deque()).append(job)
+
+        def start(job):
+            c = self.idle.pop() if self.idle else pycurl.Curl()
+            try:
+                c.reset()
+                sanitize(c)
+                job.setup(c)
+            except BaseException:
+                self.idle.append(c)
+                raise
+            return c
+
+        def finish(c, job, error):
             try:
-                c.perform()
-            except pycurl.error:
-                os.unlink(local_tmp)
-                return False
-        if c.getinfo(pycurl.RESPONSE_CODE) >= 400:
-            os.unlink(local_tmp)
+                again = job.done(c, error)
+            finally:
+                self.idle.append(c)
+            return RETRY if again else job
+
+        return drive(self.multi, waiting, self.parallel, self.per_host, start, finish, self.idle.append)
+
+
+class Job:
+    ''' The download of `url` to `local`, as described for `do_download`.
+
+        After `done`, `code` is the HTTP status, or 0 if the transfer
+        failed (with `error`), and `size` is the number of bytes received.
+    '''
+    def __init__(self, url, local, *, safe=True):
+        self.url = url
+        self.local = local
+        self.safe = safe
+        if safe:
+            self.tmp = local + '.tmp'
         else:
-            if safe:
-                os.rename(local_tmp, local)
-            rv = True
-        progress.total = progress.n = progress.n - 1
-        progress.update(1)
-    return rv
+            self.tmp = local
+        self.conditions = conditional_headers(url, local)
+        self.offset = 0
+        self.code = None
+        self.error = None
+        self.size = 0
+        self._head = None
+        self._out = None
+
+    @property
+    def ok(self):
+        return self.code == 304 or bool(self.code) and self.code < 400
+
+    def setup(self, c):
+        headers = list(self.conditions)
+        self.offset = 0
+        if self.safe and os.path.exists(self.tmp):
+            meta = load_meta(self.tmp)
+            validator = if_range(meta)
+            # Without a validator, a changed file would be spliced onto
+            # the old one; start over instead.
+            if meta.get('url') == self.url and validator is not None:
+                self.offset = os.path.getsize(self.tmp)
+                headers.append(b'If-Range: ' + validator)
+        self._head = Head()
+        self._out = FileWriter(self.tmp, self.offset, self._head)
+
+        c.setopt(pycurl.HEADERFUNCTION, self._head)
+        c.setopt(pycurl.WRITEFUNCTION, self._out)
+        c.setopt(pycurl.HTTPHEADER, headers)
+        if self.offset:
+            # Ranges apply to the encoded body, and so would the resumed bytes.
+            c.setopt(pycurl.ACCEPT_ENCODING, b'identity')
+            # Not RESUME_FROM_LARGE: that fails on a 200 (e.g. when If-Range
+            # did not match), which must replace the file instead.
+            c.setopt(pycurl.RANGE, b'%d-' % self.offset)
+
+        c.setopt(pycurl.URL, self.url.encode('utf-8'))
+
+    def done(self, c, error):
+        out = self._out
+        self.error = error
+        self.size += c.getinfo(pycurl.SIZE_DOWNLOAD_T)
+        if error is not None:
+            out.close()
+            self.code = 0
+            if not out.opened:
+                pass # nothing written; any partial file is still good
+            elif self.safe and self._head.fields.get('content-encoding', 'identity') == 'identity':
+                save_meta(self.tmp, self.url, self._head) # to be resumed
+            else:
+                remove(self.tmp)
+            return False
+        self.code = c.getinfo(pycurl.RESPONSE_CODE)
+        if self.code == 304:
+            out.close()
+            return False
+        if self.code == 416 and self.offset:
+            # The partial file is no use (probably complete, or the file shrank).
+            out.close()
+            remove(self.tmp)
+            return True
+        if self.code >= 400:
+            # Error bodies are not written, so any partial file is kept.
+            out.close()
+            return False
+        if self.offset and self.code == 200 and not out.opened:
+            # A 200 must replace the partial file, but that empty body may
+            # be a server cutting corners; ask again, without the Range.
+            remove(self.tmp)
+            return True
+        out.create() # even for an empty body
+        out.close()
+        save_meta(self.tmp, self.url, self._head)
+        self.commit()
+        return False
+
+    def commit(self):
+        ''' Move the finished `.tmp` file (and its metadata) into place.
+        '''
+        if self.safe:
+            os.replace(self.tmp + META_SUFFIX, self.local + META_SUFFIX)
+            os.rename(self.tmp, self.local)
+
+
+class Segment:
+    ''' One range of a segmented download, for `Driver`.
+    '''
+    def __init__(self, url, fd, start, end, progress):
+        self.url = url
+        self.range = b'%d-%d' % (start, end - 1)
+        self.writer = SegmentWriter(fd, start, end, progress)
+        self.ok = False
+
+    def setup(self, c):
+        c.setopt(pycurl.ACCEPT_ENCODING, b'identity')
+        c.setopt(pycurl.URL, self.url.encode('utf-8'))
+        c.setopt(pycurl.RANGE, self.range)
+        c.setopt(pycurl.WRITEFUNCTION, self.writer)
+
+    def done(self, c, error):
+        self.ok = error is None and c.getinfo(pycurl.RESPONSE_CODE) == 206
+        return False
+
+
+class SegmentWriter:
+    def __init__(self, fd, start, end, progress):
+        self._fd = fd
+        self._offset = start
+        self._end = end
+        self._tqdm = progress
+
+    def __call__(self, chunk):
+        if self._offset + len(chunk) > self._end:
+            return 0 # not the range we asked for; abort
+        view = memoryview(chunk)
+        while view:
+            n = os.pwrite(self._fd, view, self._offset)
+            self._offset += n
+            view = view[n:]
+        self._tqdm.update(len(chunk))
+
+
+class Head:
+    ''' A HEADERFUNCTION that keeps the status and fields of the final response.
+    '''
+    def __init__(self):
+        self.status = 0
+        self.fields = {}
+
+    def __call__(self, line):
+        if line.startswith(b'HTTP/'):
+            # after a redirect or 100 Continue, start over
+            self.status = int(line.split()[1])
+            self.fields = {}
+            return
+        name, sep, value = line.partition(b':')
+        if sep:
+            self.fields[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+
+
+class FileWriter:
+    ''' A WRITEFUNCTION that only opens the file once a body arrives.
+
+        If `offset`, the body is appended there, provided that the
+        server actually sent a 206; otherwise the file is overwritten.
+        The bodies of error responses are discarded.
+    '''
+    def __init__(self, path, offset, head):
+        self._path = path
+        self._offset = offset
+        self._head = head
+        self._out = None
+        self.opened = False
+
+    def __call__(self, chunk):
+        if self._head.status >= 400:
+            return
+        if self._out is None:
+            self.create()
+        self._out.write(chunk)
+
+    def create(self):
+        if self.opened:
+            return
+        self.opened = True
+        if self._offset and self._head.status == 206:
+            self._out = open(self._path, 'r+b')
+            self._out.seek(self._offset)
+            self._out.truncate()
+        else:
+            self._out = open(self._path, 'wb')
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
 
 
 class XferInfoDl:
-    def __init__(self, url, progress):
+    def __init__(self, url, progress, offset=0):
         self._tqdm = progress
+        self._offset = offset
 
     def __call__(self, dltotal, dlnow, ultotal, ulnow):
+        if dltotal:
+            dltotal += self._offset
+        dlnow += self._offset
         n = dlnow - self._tqdm.n
         self._tqdm.total = dltotal or guess_size(dlnow)
         if n:
@@ -68,4 +523,35 @@ def guess_size(now):
     ''' Return a number that is strictly greater than `now`,
         but likely close to `approx`.
     '''
-return 1 << now.bit_length()
+    return 1 << now.bit_length()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Download files with libcurl.')
+    parser.add_argument('url', nargs='?')
+    parser.add_argument('local', nargs='?')
+    parser.add_argument('--segments', type=int, default=1, help='fetch a single file as this many concurrent ranges')
+    parser.add_argument('--manifest', help='a JSONL file of [url, local] pairs to download')
+    parser.add_argument('--parallel', type=int, default=8, help='concurrent transfers of a manifest')
+    parser.add_argument('--per-host', type=int, help='concurrent transfers of a manifest per host')
+    parser.add_argument('--refresh', action='store_true', help='check existing files of a manifest for changes')
+    parser.add_argument('--summary', help='write the summary of a manifest as JSON to this file')
+    args = parser.parse_args(argv)
+    if args.manifest is None:
+        if args.url is None or args.local is None:
+            parser.error('either url and local, or --manifest, is required')
+        return 0 if do_download(args.url, args.local, segments=args.segments) else 1
+    summary = do_batch(read_manifest(args.manifest), parallel=args.parallel, per_host=args.per_host, refresh=args.refresh)
+    if args.summary is not None:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+    print('%(downloaded)d downloaded, %(unchanged)d unchanged, %(skipped)d skipped, %(failed)d failed' % summary, file=sys.stderr)
+    print('%s in %.1fs (%s/s)' % (tqdm.format_sizeof(summary['bytes'], 'B'), summary['seconds'], tqdm.format_sizeof(summary['bytes_per_second'], 'B')), file=sys.stderr)
+    for failure in summary['failures']:
+        print('failed: %(url)s -> %(local)s (%(code)s, %(error)s)' % failure, file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
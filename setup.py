@@ -10,5 +10,6 @@ setup(
     author_email='b.r.longbons@gmail.com',
     url='https://github.com/o11c/python-curl-requests',
     packages=['curl_requests'],
+    python_requires='>=3.7',
     install_requires=['pycurl'],
 )